@@ -1,6 +1,5 @@
 from app import create_app, db
-from app.models import User, Resource, ResourceType, EmergencyRequest, USSDSession
-from flask_migrate import upgrade
+from app.models import User, Resource, ResourceType, ResourceFeatures, EmergencyRequest, USSDSession, RequestRollup, LatencyHistogram
 import os
 
 app = create_app(os.getenv('FLASK_ENV', 'development'))
@@ -34,8 +33,20 @@ def init_db():
     """Initialize database with sample data"""
     db.create_all()
     
+    # Build rollups for requests recorded before the rollup tables existed
+    if EmergencyRequest.query.first() and not RequestRollup.query.first():
+        RequestRollup.rebuild()
+        db.session.commit()
+    
+    # Likewise for lifecycle latency histograms
+    if EmergencyRequest.query.filter(EmergencyRequest.matched_at.isnot(None)).first() and not LatencyHistogram.query.first():
+        LatencyHistogram.rebuild()
+        db.session.commit()
+    
     # Check if we already have sample data
     if Resource.query.first():
+        if ResourceFeatures.backfill():
+            db.session.commit()
         return
     
     # Add sample resources
@@ -126,6 +137,7 @@ def init_db():
     ]
     
     for resource in sample_resources:
+        resource.refresh_features()
         db.session.add(resource)
     
     db.session.commit()
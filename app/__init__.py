@@ -1,17 +1,24 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from config.config import config
+import os
 
 db = SQLAlchemy()
-migrate = Migrate()
 
 def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
     db.init_app(app)
-    migrate.init_app(app, db)
+    
+    # Alembic is only needed for `flask db ...`; keep it off the worker import path
+    cli = os.environ.get('FLASK_RUN_FROM_CLI') == 'true'
+    if cli:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    
+    from app.services.registry import ServiceRegistry, wake_waitlist, invalidate_matches, patch_snapshot
+    ServiceRegistry(app)
     
     # Register blueprints
     from app.routes.ussd import ussd_bp
@@ -22,4 +29,17 @@ def create_app(config_name='default'):
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(api_bp, url_prefix='/api')
     
+    # Deliver model change events once their transaction has committed
+    from app.events import event_bus
+    event_bus.subscribe('capacity_changed', wake_waitlist)
+    event_bus.subscribe('capacity_changed', invalidate_matches)
+    event_bus.subscribe('resource_changed', invalidate_matches)
+    event_bus.subscribe('resource_changed', patch_snapshot)
+    app.after_request(event_bus.dispatch_committed)
+    
+    if cli:
+        # Maintenance commands: `flask reconcile-capacity [--repair] [--every N]`
+        from app.cli import reconcile_capacity
+        app.cli.add_command(reconcile_capacity)
+    
     return app
\ No newline at end of file
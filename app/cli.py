@@ -0,0 +1,27 @@
+import click
+import time
+
+@click.command('reconcile-capacity')
+@click.option('--repair', is_flag=True, help='Overwrite drifted capacities instead of only reporting them')
+@click.option('--every', type=int, default=0, help='Repeat every N seconds (run under a process supervisor)')
+def reconcile_capacity(repair, every):
+    """Diff available capacity against active requests per resource"""
+    from app.events import event_bus
+    from app.services.registry import get_service
+    
+    while True:
+        started = time.perf_counter()
+        report = get_service('reconciler').reconcile(repair=repair)
+        
+        # Outside a request nothing else drains committed events (waitlist wake-ups, cache invalidation)
+        event_bus.dispatch_committed()
+        
+        click.echo(f"Checked {report['checked']} resources in {time.perf_counter() - started:.2f}s: "
+                   f"{report['drifted']} drifted (total drift {report['total_drift']}), {report['repaired']} repaired")
+        for row in report['resources'][:20]:
+            click.echo(f"  #{row['resource_id']} {row['name']}: available {row['available_capacity']}, "
+                       f"expected {row['expected_available']} ({row['occupied']} active of {row['total_capacity']})")
+        
+        if not every:
+            break
+        time.sleep(every)
@@ -0,0 +1,53 @@
+from app import db
+from collections import defaultdict
+from sqlalchemy import event
+import logging
+
+class EventBus:
+    """In-process publish/subscribe bus for model change events"""
+    
+    def __init__(self):
+        self._handlers = defaultdict(list)
+    
+    def subscribe(self, event_name, handler):
+        if handler not in self._handlers[event_name]:
+            self._handlers[event_name].append(handler)
+    
+    def unsubscribe(self, event_name, handler):
+        if handler in self._handlers[event_name]:
+            self._handlers[event_name].remove(handler)
+    
+    def publish(self, event_name, **payload):
+        """Call every handler for an event right away"""
+        for handler in list(self._handlers[event_name]):
+            try:
+                handler(**payload)
+            except Exception as e:
+                logging.error(f"Event handler error for {event_name}: {str(e)}")
+    
+    def publish_on_commit(self, event_name, session=None, **payload):
+        """Queue an event that is only delivered once the current transaction commits"""
+        session = session or db.session
+        session.info.setdefault('pending_events', []).append((event_name, payload))
+    
+    def dispatch_committed(self, response=None):
+        """Deliver events whose transaction has committed (registered as an after_request hook)"""
+        # Handlers may commit and queue further events, so drain until quiet
+        committed = db.session.info.pop('committed_events', None)
+        while committed:
+            for event_name, payload in committed:
+                self.publish(event_name, **payload)
+            committed = db.session.info.pop('committed_events', None)
+        return response
+
+event_bus = EventBus()
+
+@event.listens_for(db.session, 'after_commit')
+def _promote_pending_events(session):
+    pending = session.info.pop('pending_events', [])
+    if pending:
+        session.info.setdefault('committed_events', []).extend(pending)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _drop_pending_events(session, previous_transaction):
+    session.info.pop('pending_events', None)
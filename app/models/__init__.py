@@ -1,6 +1,11 @@
 from .user import User
-from .resource import Resource, ResourceType
+from .resource import Resource, ResourceType, ResourceFeatures
 from .request import EmergencyRequest
 from .session import USSDSession
+from .waitlist import WaitlistEntry
+from .rollup import RequestRollup
+from .latency import LatencyHistogram
+from .search import ResourceSearch
+from .spatial import ResourceGeoIndex
 
-__all__ = ['User', 'Resource', 'ResourceType', 'EmergencyRequest', 'USSDSession']
\ No newline at end of file
+__all__ = ['User', 'Resource', 'ResourceType', 'ResourceFeatures', 'EmergencyRequest', 'USSDSession', 'WaitlistEntry', 'RequestRollup', 'LatencyHistogram', 'ResourceSearch', 'ResourceGeoIndex']
\ No newline at end of file
@@ -0,0 +1,192 @@
+from app import db
+from bisect import bisect_left
+from sqlalchemy import event, inspect
+from app.regions import region_for
+from .resource import ResourceType
+from .request import EmergencyRequest
+from .rollup import upsert_increments
+
+# Lifecycle stages measured from created_at, and the timestamp that ends each one
+STAGES = {
+    'match': 'matched_at',
+    'complete': 'completed_at'
+}
+
+# Bucket upper bounds in seconds (1m .. 2d); the last bucket catches everything slower
+LATENCY_BUCKETS = (60, 300, 900, 1800, 3600, 7200, 21600, 43200, 86400, 172800)
+
+def bucket_index(seconds):
+    return bisect_left(LATENCY_BUCKETS, seconds)
+
+def bucket_label(index):
+    return str(LATENCY_BUCKETS[index]) if index < len(LATENCY_BUCKETS) else '+Inf'
+
+class LatencyHistogram(db.Model):
+    """Fixed-bucket request lifecycle latency counts per stage, type and region"""
+    __tablename__ = 'request_latency_histograms'
+    __table_args__ = (
+        db.UniqueConstraint('stage', 'resource_type', 'region_key', 'bucket', name='uq_latency_histogram_bucket'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    stage = db.Column(db.String(20), nullable=False)
+    resource_type = db.Column(db.Enum(ResourceType), nullable=False)
+    region_key = db.Column(db.String(20), nullable=False, default='')
+    bucket = db.Column(db.Integer, nullable=False)  # index into LATENCY_BUCKETS
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total_seconds = db.Column(db.Float, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<LatencyHistogram {self.stage} {self.resource_type.value}/{self.region_key} le={bucket_label(self.bucket)}: {self.count}>'
+    
+    @staticmethod
+    def observation(request, stage, ended_at):
+        """(key, seconds) for one request finishing a stage, or None without both timestamps"""
+        if not request.created_at or not ended_at:
+            return None
+        
+        seconds = max((ended_at - request.created_at).total_seconds(), 0)
+        key = {
+            'stage': stage,
+            'resource_type': request.resource_type,
+            'region_key': region_for(request.latitude, request.longitude, request.location) or '',
+            'bucket': bucket_index(seconds)
+        }
+        return key, seconds
+    
+    @classmethod
+    def record_many(cls, connection, requests, stage, ended_at):
+        """Record a stage for many requests with one upsert per affected bucket (for bulk UPDATEs)"""
+        increments = {}
+        for request in requests:
+            observed = cls.observation(request, stage, ended_at)
+            if observed is None:
+                continue
+            key, seconds = observed
+            key = tuple(key.items())
+            count, total = increments.get(key, (0, 0))
+            increments[key] = (count + 1, total + seconds)
+        
+        for key, (count, total) in increments.items():
+            upsert_increments(connection, cls.__table__, dict(key), {'count': count, 'total_seconds': total})
+    
+    @classmethod
+    def rebuild(cls):
+        """Recompute every histogram from emergency_requests (for data predating the table)"""
+        cls.query.delete()
+        rows = db.session.query(
+            EmergencyRequest.created_at,
+            EmergencyRequest.matched_at,
+            EmergencyRequest.completed_at,
+            EmergencyRequest.resource_type,
+            EmergencyRequest.location,
+            EmergencyRequest.latitude,
+            EmergencyRequest.longitude
+        ).filter(
+            db.or_(EmergencyRequest.matched_at.isnot(None), EmergencyRequest.completed_at.isnot(None))
+        ).yield_per(1000)
+        
+        totals = {}
+        for row in rows:
+            for stage, timestamp in STAGES.items():
+                observed = cls.observation(row, stage, getattr(row, timestamp))
+                if observed is None:
+                    continue
+                key, seconds = observed
+                key = tuple(key.items())
+                count, total = totals.get(key, (0, 0))
+                totals[key] = (count + 1, total + seconds)
+        
+        db.session.bulk_insert_mappings(cls, [
+            dict(key, count=count, total_seconds=total)
+            for key, (count, total) in totals.items()
+        ])
+        return len(totals)
+    
+    @classmethod
+    def summary(cls, stage=None, resource_type=None, region=None, group_by=()):
+        """Bucketed counts with mean and estimated percentiles, split by the group_by dimensions"""
+        dimensions = {
+            'resource_type': cls.resource_type,
+            'region': cls.region_key
+        }
+        group_columns = [dimensions[name] for name in group_by]
+        
+        query = db.session.query(
+            cls.stage, *group_columns, cls.bucket,
+            db.func.sum(cls.count), db.func.sum(cls.total_seconds)
+        )
+        if stage:
+            query = query.filter(cls.stage == stage)
+        if resource_type:
+            query = query.filter(cls.resource_type == resource_type)
+        if region:
+            query = query.filter(cls.region_key == region)
+        
+        histograms = {}
+        for row in query.group_by(cls.stage, *group_columns, cls.bucket).all():
+            row_stage, group_values, bucket, count, total = row[0], row[1:-3], row[-3], row[-2], row[-1]
+            group_values = tuple(value.value if isinstance(value, ResourceType) else (value or None) for value in group_values)
+            histogram = histograms.setdefault((row_stage,) + group_values, {
+                'counts': [0] * (len(LATENCY_BUCKETS) + 1),
+                'total_seconds': 0.0
+            })
+            histogram['counts'][bucket] += count or 0
+            histogram['total_seconds'] += total or 0
+        
+        results = []
+        for key, histogram in sorted(histograms.items(), key=lambda item: tuple(str(part) for part in item[0])):
+            counts = histogram['counts']
+            observed = sum(counts)
+            result = {'stage': key[0]}
+            result.update(dict(zip(group_by, key[1:])))
+            result.update({
+                'count': observed,
+                'mean_seconds': histogram['total_seconds'] / observed if observed else None,
+                'p50_seconds': percentile_bound(counts, 0.50),
+                'p90_seconds': percentile_bound(counts, 0.90),
+                'p99_seconds': percentile_bound(counts, 0.99),
+                'buckets': [
+                    {'le': bucket_label(index), 'count': count}
+                    for index, count in enumerate(counts)
+                ]
+            })
+            results.append(result)
+        return results
+
+def percentile_bound(counts, fraction):
+    """Upper bound of the bucket holding the given quantile (None when empty or in the overflow bucket)"""
+    total = sum(counts)
+    if not total:
+        return None
+    
+    target = fraction * total
+    running = 0
+    for index, count in enumerate(counts):
+        running += count
+        if running >= target:
+            return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else None
+    return None
+
+def _record_stages(connection, target, changed):
+    for stage, timestamp in STAGES.items():
+        if timestamp in changed:
+            observed = LatencyHistogram.observation(target, stage, getattr(target, timestamp))
+            if observed is not None:
+                key, seconds = observed
+                upsert_increments(connection, LatencyHistogram.__table__, key, {'count': 1, 'total_seconds': seconds})
+
+@event.listens_for(EmergencyRequest, 'after_insert')
+def _latency_request_created(mapper, connection, target):
+    _record_stages(connection, target, {
+        timestamp for timestamp in STAGES.values() if getattr(target, timestamp) is not None
+    })
+
+@event.listens_for(EmergencyRequest, 'after_update')
+def _latency_stage_reached(mapper, connection, target):
+    # Only the first stamp counts; a re-stamped stage would double-count the request
+    state = inspect(target)
+    _record_stages(connection, target, {
+        timestamp for timestamp in STAGES.values()
+        if state.attrs[timestamp].history.added and not any(state.attrs[timestamp].history.deleted)
+    })
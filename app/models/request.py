@@ -1,5 +1,8 @@
 from app import db
+from app.events import event_bus
 from datetime import datetime
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import object_session
 from enum import Enum
 from .resource import ResourceType
 
@@ -10,9 +13,31 @@ class RequestStatus(Enum):
     COMPLETED = 'completed'
     CANCELLED = 'cancelled'
 
+# Forward-only lifecycle; completed and cancelled requests are final
+ALLOWED_TRANSITIONS = {
+    RequestStatus.PENDING: {RequestStatus.MATCHED, RequestStatus.CONFIRMED, RequestStatus.COMPLETED, RequestStatus.CANCELLED},
+    RequestStatus.MATCHED: {RequestStatus.CONFIRMED, RequestStatus.COMPLETED, RequestStatus.CANCELLED},
+    RequestStatus.CONFIRMED: {RequestStatus.COMPLETED, RequestStatus.CANCELLED},
+    RequestStatus.COMPLETED: set(),
+    RequestStatus.CANCELLED: set()
+}
+
+# Requests in these statuses hold one unit of their resource's capacity
+ACTIVE_STATUSES = (RequestStatus.PENDING, RequestStatus.MATCHED, RequestStatus.CONFIRMED)
+
+# Timestamp column stamped when a request enters each status
+STATUS_TIMESTAMPS = {
+    RequestStatus.MATCHED: 'matched_at',
+    RequestStatus.CONFIRMED: 'confirmed_at',
+    RequestStatus.COMPLETED: 'completed_at'
+}
+
 class EmergencyRequest(db.Model):
     __tablename__ = 'emergency_requests'
     
+    # Columns that change after insert; keys the JSON fragment cache (there is no updated_at)
+    SERIALIZATION_VERSION = ('status', 'resource_id', 'matched_at', 'confirmed_at', 'completed_at')
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     resource_id = db.Column(db.Integer, db.ForeignKey('resources.id'))
@@ -60,12 +85,46 @@ class EmergencyRequest(db.Model):
         }
     
     def update_status(self, new_status):
+        new_status = RequestStatus(new_status)
         self.status = new_status
-        now = datetime.utcnow()
         
-        if new_status == RequestStatus.MATCHED:
-            self.matched_at = now
-        elif new_status == RequestStatus.CONFIRMED:
-            self.confirmed_at = now
-        elif new_status == RequestStatus.COMPLETED:
-            self.completed_at = now
\ No newline at end of file
+        timestamp = STATUS_TIMESTAMPS.get(new_status)
+        if timestamp:
+            setattr(self, timestamp, datetime.utcnow())
+    
+    def can_transition_to(self, new_status):
+        return new_status in ALLOWED_TRANSITIONS[self.status or RequestStatus.PENDING]
+    
+    @staticmethod
+    def transition_sources(new_status):
+        """Statuses a request may move to new_status from"""
+        return [status for status, targets in ALLOWED_TRANSITIONS.items() if new_status in targets]
+
+def _status_value(status):
+    return status.value if isinstance(status, RequestStatus) else status
+
+@event.listens_for(EmergencyRequest, 'after_insert')
+def _request_created(mapper, connection, target):
+    event_bus.publish_on_commit(
+        'request_created',
+        session=object_session(target),
+        request_id=target.id,
+        resource_type=target.resource_type.value,
+        status=_status_value(target.status),
+        location=target.location,
+        created_at=target.created_at.isoformat() if target.created_at else None
+    )
+
+@event.listens_for(EmergencyRequest, 'after_update')
+def _request_updated(mapper, connection, target):
+    history = inspect(target).attrs.status.history
+    if not history.has_changes() or not history.deleted:
+        return
+    event_bus.publish_on_commit(
+        'request_status_changed',
+        session=object_session(target),
+        request_id=target.id,
+        resource_type=target.resource_type.value,
+        old_status=_status_value(history.deleted[0]),
+        new_status=_status_value(target.status)
+    )
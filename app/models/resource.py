@@ -1,15 +1,34 @@
 from app import db
+from app.events import event_bus
+from app.regions import region_for
 from datetime import datetime
 from enum import Enum
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import object_session
+import re
 
 class ResourceType(Enum):
     SHELTER = 'shelter'
     FOOD = 'food'
     TRANSPORT = 'transport'
 
+# Organization keywords mapped to reliability tiers (highest first)
+RELIABILITY_TIERS = [
+    (20, ['government', 'ministry', 'nema', 'red cross']),
+    (15, ['ngo', 'foundation', 'charity']),
+]
+DEFAULT_RELIABILITY = 10
+
+def normalize_location(text):
+    """Lowercase a location and collapse punctuation to single spaces"""
+    return ' '.join(re.findall(r'[a-z0-9]+', (text or '').lower()))
+
 class Resource(db.Model):
     __tablename__ = 'resources'
     
+    # Columns that change whenever to_dict() would; keys the JSON fragment cache
+    SERIALIZATION_VERSION = ('updated_at',)
+    
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
@@ -36,6 +55,8 @@ class Resource(db.Model):
     
     # Relationships
     emergency_requests = db.relationship('EmergencyRequest', backref='resource', lazy=True)
+    features = db.relationship('ResourceFeatures', backref='resource', uselist=False,
+                               lazy='joined', cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<Resource {self.name} ({self.resource_type.value})>'
@@ -59,6 +80,13 @@ class Resource(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
     
+    def refresh_features(self):
+        """Recompute derived scoring features after a create or edit"""
+        if self.features is None:
+            self.features = ResourceFeatures()
+        self.features.update_from(self)
+        return self.features
+    
     def has_capacity(self):
         return self.is_active and self.available_capacity > 0
     
@@ -71,5 +99,124 @@ class Resource(db.Model):
     def release_capacity(self, amount=1):
         if self.available_capacity + amount <= self.total_capacity:
             self.available_capacity += amount
+            event_bus.publish_on_commit('capacity_changed', resource_id=self.id)
             return True
-        return False
\ No newline at end of file
+        return False
+
+# Attributes whose changes affect the dashboard's per-type totals
+_DASHBOARD_ATTRS = ('resource_type', 'is_active', 'total_capacity', 'available_capacity')
+
+# Attributes that decide which places and regions a resource matches
+_POSITION_ATTRS = ('location', 'latitude', 'longitude')
+_FEATURE_POSITION_ATTRS = ('location_key', 'region_key')
+
+def _dashboard_contribution(values):
+    if not values['is_active']:
+        return None
+    return {
+        'resource_type': values['resource_type'].value,
+        'total_capacity': values['total_capacity'] or 0,
+        'available_capacity': values['available_capacity'] or 0
+    }
+
+def _previous_value(state, attr):
+    history = state.attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, attr)
+
+def _publish_resource_changed(target, before, moved=False):
+    after = _dashboard_contribution({attr: getattr(target, attr) for attr in _DASHBOARD_ATTRS})
+    event_bus.publish_on_commit(
+        'resource_changed',
+        session=object_session(target),
+        resource_id=target.id,
+        before=before,
+        after=after,
+        moved=moved
+    )
+
+@event.listens_for(Resource, 'after_insert')
+def _resource_created(mapper, connection, target):
+    _publish_resource_changed(target, before=None)
+
+@event.listens_for(Resource, 'after_update')
+def _resource_updated(mapper, connection, target):
+    state = inspect(target)
+    moved = any(state.attrs[attr].history.has_changes() for attr in _POSITION_ATTRS)
+    if not moved and not any(state.attrs[attr].history.has_changes() for attr in _DASHBOARD_ATTRS):
+        return
+    before = _dashboard_contribution({attr: _previous_value(state, attr) for attr in _DASHBOARD_ATTRS})
+    _publish_resource_changed(target, before=before, moved=moved)
+
+class ResourceFeatures(db.Model):
+    """Scoring features derived from a resource at write time"""
+    __tablename__ = 'resource_features'
+    
+    resource_id = db.Column(db.Integer, db.ForeignKey('resources.id'), primary_key=True)
+    reliability_score = db.Column(db.Integer, default=0)
+    contact_score = db.Column(db.Integer, default=0)
+    location_key = db.Column(db.String(200), default='')  # normalized location
+    region_key = db.Column(db.String(20), index=True)  # state partition, see app.regions
+    
+    def __repr__(self):
+        return f'<ResourceFeatures {self.resource_id}>'
+    
+    @property
+    def location_tokens(self):
+        return set((self.location_key or '').split())
+    
+    def update_from(self, resource):
+        self.reliability_score = self.reliability_for(resource.organization)
+        self.contact_score = 10 if resource.contact_phone else 0
+        self.location_key = normalize_location(resource.location)
+        self.region_key = region_for(resource.latitude, resource.longitude, resource.location)
+    
+    @classmethod
+    def in_regions(cls, region_keys):
+        """Filter clause for resources in the given partitions or with no known region"""
+        return db.or_(cls.region_key.in_(region_keys), cls.region_key.is_(None))
+    
+    @staticmethod
+    def reliability_for(organization):
+        if not organization:
+            return 0
+        
+        organization = organization.lower()
+        for score, keywords in RELIABILITY_TIERS:
+            if any(keyword in organization for keyword in keywords):
+                return score
+        return DEFAULT_RELIABILITY
+    
+    @classmethod
+    def for_resource(cls, resource):
+        """Build detached features for a resource that has none stored yet"""
+        features = cls(resource_id=resource.id)
+        features.update_from(resource)
+        return features
+    
+    @classmethod
+    def backfill(cls):
+        """Create features for resources stored before this table existed"""
+        missing = Resource.query.filter(~Resource.features.has()).all()
+        for resource in missing:
+            resource.refresh_features()
+        return len(missing)
+
+@event.listens_for(db.session, 'before_flush')
+def _create_missing_features(session, flush_context, instances):
+    # Region-scoped queries outer join features; a new resource should not start without a region
+    for instance in session.new:
+        if isinstance(instance, Resource) and instance.features is None:
+            instance.refresh_features()
+
+@event.listens_for(ResourceFeatures, 'after_insert')
+@event.listens_for(ResourceFeatures, 'after_update')
+def _features_changed(mapper, connection, target):
+    # A new or recomputed region or location key moves the resource between partitions
+    state = inspect(target)
+    resource = target.resource
+    if resource is None or not any(state.attrs[attr].history.has_changes() for attr in _FEATURE_POSITION_ATTRS):
+        return
+    contribution = _dashboard_contribution({attr: getattr(resource, attr) for attr in _DASHBOARD_ATTRS})
+    _publish_resource_changed(resource, before=contribution, moved=True)
@@ -0,0 +1,203 @@
+from app import db
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, inspect
+from app.regions import region_for
+from .resource import ResourceType, normalize_location
+from .request import EmergencyRequest, RequestStatus
+
+GRANULARITIES = ('hour', 'day')
+
+def bucket_start(timestamp, granularity):
+    """Truncate a timestamp to the start of its hour or day bucket"""
+    if granularity == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def upsert_increments(connection, table, key, increments):
+    """Add increments to the row identified by key (a unique constraint), inserting it if missing"""
+    dialect = connection.dialect.name
+    
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table).values(**increments, **key).on_conflict_do_update(
+            index_elements=list(key),
+            set_={column: table.c[column] + value for column, value in increments.items()}
+        )
+        connection.execute(statement)
+        return
+    
+    conditions = [table.c[column] == value for column, value in key.items()]
+    result = connection.execute(
+        table.update().where(*conditions).values(
+            **{column: table.c[column] + value for column, value in increments.items()}
+        )
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(**increments, **key))
+
+class RequestRollup(db.Model):
+    """Request counts per time bucket, type, current status, region and location key"""
+    __tablename__ = 'request_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('granularity', 'bucket_start', 'resource_type', 'status', 'region_key',
+                            'location_key', name='uq_request_rollup_bucket'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    granularity = db.Column(db.String(10), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    resource_type = db.Column(db.Enum(ResourceType), nullable=False)
+    status = db.Column(db.Enum(RequestStatus), nullable=False)
+    region_key = db.Column(db.String(20), nullable=False, default='')
+    location_key = db.Column(db.String(200), nullable=False, default='')
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<RequestRollup {self.granularity} {self.bucket_start} {self.resource_type.value}/{self.status.value}: {self.count}>'
+    
+    def to_dict(self):
+        return {
+            'granularity': self.granularity,
+            'bucket_start': self.bucket_start.isoformat(),
+            'resource_type': self.resource_type.value,
+            'status': self.status.value,
+            'region': self.region_key or None,
+            'location': self.location_key,
+            'count': self.count
+        }
+    
+    @staticmethod
+    def bucket_keys(request, status):
+        """The hour and day bucket keys a request counts towards in a given status"""
+        created_at = request.created_at or datetime.utcnow()
+        region_key = region_for(request.latitude, request.longitude, request.location) or ''
+        location_key = normalize_location(request.location)
+        
+        for granularity in GRANULARITIES:
+            yield {
+                'granularity': granularity,
+                'bucket_start': bucket_start(created_at, granularity),
+                'resource_type': request.resource_type,
+                'status': status,
+                'region_key': region_key,
+                'location_key': location_key
+            }
+    
+    @classmethod
+    def record(cls, connection, request, status, delta):
+        """Add delta to the hour and day buckets of one request, inside the caller's transaction"""
+        for key in cls.bucket_keys(request, status):
+            cls._upsert(connection, key, delta)
+    
+    @classmethod
+    def record_transition(cls, connection, requests, old_status, new_status):
+        """Move many requests between statuses with one upsert per affected bucket (for bulk UPDATEs)"""
+        deltas = {}
+        for request in requests:
+            for status, delta in ((old_status, -1), (new_status, 1)):
+                for key in cls.bucket_keys(request, status):
+                    key = tuple(key.items())
+                    deltas[key] = deltas.get(key, 0) + delta
+        
+        for key, delta in deltas.items():
+            if delta:
+                cls._upsert(connection, dict(key), delta)
+    
+    @classmethod
+    def _upsert(cls, connection, key, delta):
+        upsert_increments(connection, cls.__table__, key, {'count': delta})
+    
+    @classmethod
+    def rebuild(cls):
+        """Recompute every bucket from emergency_requests (for data predating the rollups)"""
+        cls.query.delete()
+        rows = db.session.query(
+            EmergencyRequest.created_at,
+            EmergencyRequest.resource_type,
+            EmergencyRequest.status,
+            EmergencyRequest.location,
+            EmergencyRequest.latitude,
+            EmergencyRequest.longitude
+        ).yield_per(1000)
+        
+        counts = {}
+        for created_at, resource_type, status, location, latitude, longitude in rows:
+            created_at = created_at or datetime.utcnow()
+            region_key = region_for(latitude, longitude, location) or ''
+            for granularity in GRANULARITIES:
+                key = (granularity, bucket_start(created_at, granularity), resource_type,
+                       status or RequestStatus.PENDING, region_key, normalize_location(location))
+                counts[key] = counts.get(key, 0) + 1
+        
+        db.session.bulk_insert_mappings(cls, [
+            {
+                'granularity': granularity,
+                'bucket_start': start,
+                'resource_type': resource_type,
+                'status': status,
+                'region_key': region_key,
+                'location_key': location_key,
+                'count': count
+            }
+            for (granularity, start, resource_type, status, region_key, location_key), count in counts.items()
+        ])
+        return len(counts)
+    
+    @classmethod
+    def series(cls, granularity='hour', start=None, end=None, resource_type=None,
+               status=None, region=None, location=None, group_by=('resource_type',)):
+        """Summed counts per bucket over a time range, split by the group_by dimensions"""
+        end = end or datetime.utcnow()
+        start = start or end - (timedelta(days=3) if granularity == 'hour' else timedelta(days=30))
+        
+        dimensions = {
+            'resource_type': cls.resource_type,
+            'status': cls.status,
+            'region': cls.region_key,
+            'location': cls.location_key
+        }
+        group_columns = [dimensions[name] for name in group_by]
+        
+        query = db.session.query(
+            cls.bucket_start, *group_columns, func.sum(cls.count)
+        ).filter(
+            cls.granularity == granularity,
+            cls.bucket_start >= bucket_start(start, granularity),
+            cls.bucket_start <= end
+        )
+        
+        if resource_type:
+            query = query.filter(cls.resource_type == resource_type)
+        if status:
+            query = query.filter(cls.status == status)
+        if region:
+            query = query.filter(cls.region_key == region)
+        if location:
+            query = query.filter(cls.location_key == normalize_location(location))
+        
+        rows = query.group_by(cls.bucket_start, *group_columns).order_by(cls.bucket_start).all()
+        
+        series = []
+        for row in rows:
+            point = {'bucket_start': row[0].isoformat(), 'count': int(row[-1])}
+            for name, value in zip(group_by, row[1:-1]):
+                point[name] = value.value if hasattr(value, 'value') else value
+            series.append(point)
+        return series
+
+
+@event.listens_for(EmergencyRequest, 'after_insert')
+def _rollup_request_created(mapper, connection, target):
+    RequestRollup.record(connection, target, target.status or RequestStatus.PENDING, 1)
+
+@event.listens_for(EmergencyRequest, 'after_update')
+def _rollup_status_changed(mapper, connection, target):
+    history = inspect(target).attrs.status.history
+    if not history.deleted or not history.added:
+        return
+    old_status = history.deleted[0] or RequestStatus.PENDING
+    RequestRollup.record(connection, target, old_status, -1)
+    RequestRollup.record(connection, target, target.status, 1)
@@ -0,0 +1,132 @@
+from app import db
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from .resource import Resource
+import logging
+import re
+
+SEARCH_TABLE = 'resource_search'
+SEARCH_COLUMNS = ('name', 'description', 'location', 'organization')
+
+# bm25 column weights, in SEARCH_COLUMNS order: a hit in the name outranks one in the description
+SEARCH_WEIGHTS = (10.0, 1.0, 5.0, 2.0)
+
+_COLUMN_LIST = ', '.join(SEARCH_COLUMNS)
+_NEW_VALUES = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+_OLD_VALUES = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+
+# External-content FTS5 table over resources; triggers keep it in step with every write
+_INDEX_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        {_COLUMN_LIST}, content='resources', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON resources BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, {_COLUMN_LIST}) VALUES (new.id, {_NEW_VALUES});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON resources BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {_COLUMN_LIST}) VALUES ('delete', old.id, {_OLD_VALUES});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE OF {_COLUMN_LIST} ON resources BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {_COLUMN_LIST}) VALUES ('delete', old.id, {_OLD_VALUES});
+        INSERT INTO {SEARCH_TABLE}(rowid, {_COLUMN_LIST}) VALUES (new.id, {_NEW_VALUES});
+    END"""
+]
+
+class ResourceSearch:
+    """Ranked prefix search over resource text, backed by SQLite FTS5 where available"""
+    
+    # Engines known to have the index; other databases fall back to LIKE filters
+    _indexed_engines = set()
+    
+    @staticmethod
+    def search_terms(text):
+        """Lowercase word tokens from free text, dropping FTS syntax characters"""
+        return re.findall(r'\w+', (text or '').lower())
+    
+    @classmethod
+    def match_expression(cls, text, column=None):
+        """Build an FTS5 query where every term must match as a prefix"""
+        terms = cls.search_terms(text)
+        if not terms:
+            return None
+        
+        expression = ' '.join(f'"{term}"*' for term in terms)
+        return f'{column} : ({expression})' if column else expression
+    
+    @classmethod
+    def is_available(cls):
+        engine = db.engine
+        if engine in cls._indexed_engines:
+            return True
+        if engine.dialect.name != 'sqlite':
+            return False
+        
+        exists = db.session.execute(
+            db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': SEARCH_TABLE}
+        ).first()
+        if exists:
+            cls._indexed_engines.add(engine)
+        return bool(exists)
+    
+    @classmethod
+    def apply(cls, query, text, column=None, ranked=True):
+        """Restrict a Resource query to search hits, best matches first when ranked"""
+        expression = cls.match_expression(text, column)
+        if expression is None:
+            return query
+        
+        if not cls.is_available():
+            columns = [getattr(Resource, column)] if column else [getattr(Resource, name) for name in SEARCH_COLUMNS]
+            return query.filter(*[
+                db.or_(*[column_attr.ilike(f'%{term}%') for column_attr in columns])
+                for term in cls.search_terms(text)
+            ])
+        
+        weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+        hits = db.select(
+            db.literal_column('rowid').label('resource_id'),
+            db.literal_column(f'bm25({SEARCH_TABLE}, {weights})').label('rank')
+        ).select_from(db.table(SEARCH_TABLE)).where(
+            db.text(f'{SEARCH_TABLE} MATCH :search_expression').bindparams(search_expression=expression)
+        ).subquery()
+        
+        query = query.join(hits, hits.c.resource_id == Resource.id)
+        return query.order_by(hits.c.rank) if ranked else query
+    
+    @classmethod
+    def install(cls, connection):
+        """Create the index and its triggers, populating it from existing rows on first install"""
+        if connection.dialect.name != 'sqlite':
+            return
+        
+        existed = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE,)
+        ).first()
+        
+        try:
+            for statement in _INDEX_DDL:
+                connection.exec_driver_sql(statement)
+        except OperationalError as e:
+            logging.warning(f"Resource search index unavailable, using LIKE search: {str(e)}")
+            return
+        
+        if not existed:
+            connection.exec_driver_sql(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+    
+    @classmethod
+    def rebuild(cls):
+        """Re-index every resource, e.g. after rows were written with triggers disabled"""
+        if cls.is_available():
+            db.session.execute(db.text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"))
+
+@event.listens_for(db.metadata, 'after_create')
+def _install_search_index(target, connection, **kw):
+    ResourceSearch.install(connection)
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+        ResourceSearch._indexed_engines.discard(connection.engine)
@@ -1,9 +1,18 @@
 from app import db
 from datetime import datetime, timedelta
+from sqlalchemy import event
 import json
 
+# Version stamp written into session_data; bump when its layout changes
+SESSION_DATA_VERSION = 2
+MAX_SESSION_DATA_BYTES = 1024
+
 class USSDSession(db.Model):
     __tablename__ = 'ussd_sessions'
+    __table_args__ = (
+        # Finds a caller's latest unfinished journey on redial
+        db.Index('ix_ussd_sessions_user_activity', 'user_id', 'last_activity'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.String(100), unique=True, nullable=False)
@@ -68,21 +77,43 @@ class USSDSession(db.Model):
         self.user_input_history = json.dumps(history)
     
     def get_session_data(self):
-        if self.session_data:
-            try:
-                return json.loads(self.session_data)
-            except json.JSONDecodeError:
-                return {}
-        return {}
+        if not self.session_data:
+            return {}
+        
+        # Decode once per distinct payload; menu handlers read it several times a hop
+        cached = getattr(self, '_decoded_session_data', None)
+        if cached and cached[0] == self.session_data:
+            return dict(cached[1])
+        
+        try:
+            data = json.loads(self.session_data)
+        except json.JSONDecodeError:
+            return {}
+        self._decoded_session_data = (self.session_data, data)
+        return dict(data)
     
     def set_session_data(self, data):
-        self.session_data = json.dumps(data)
+        data = dict(data, v=SESSION_DATA_VERSION)
+        encoded = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+        if len(encoded.encode('utf-8')) > MAX_SESSION_DATA_BYTES:
+            raise ValueError(f'Session data exceeds {MAX_SESSION_DATA_BYTES} bytes')
+        self.session_data = encoded
+        self._decoded_session_data = (encoded, data)
     
     def update_session_data(self, key, value):
         data = self.get_session_data()
         data[key] = value
         self.set_session_data(data)
     
+    def set_matches(self, resources):
+        """Remember matched resources by ID only; they are re-loaded on confirmation"""
+        self.update_session_data('matches', [resource.id for resource in resources])
+    
+    def get_match_ids(self):
+        matches = self.get_session_data().get('matches', [])
+        # Sessions written before version 2 stored full resource dicts
+        return [match['id'] if isinstance(match, dict) else match for match in matches]
+    
     def is_expired(self):
         return datetime.utcnow() > self.expires_at
     
@@ -91,4 +122,23 @@ class USSDSession(db.Model):
         self.last_activity = datetime.utcnow()
     
     def end_session(self):
-        self.is_active = False
\ No newline at end of file
+        self.is_active = False
+    
+    @classmethod
+    def find_unfinished(cls, user_id, within_minutes, exclude_id=None):
+        """The caller's most recent live session that got past the main menu, if active recently"""
+        query = cls.query.filter(
+            cls.user_id == user_id,
+            cls.last_activity >= datetime.utcnow() - timedelta(minutes=within_minutes),
+            cls.is_active == True,
+            cls.current_menu.notin_(['main', 'resume'])
+        )
+        if exclude_id is not None:
+            query = query.filter(cls.id != exclude_id)
+        return query.order_by(cls.last_activity.desc()).first()
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_session_indexes(target, connection, **kw):
+    # create_all skips indexes of tables that already exist, such as in older databases
+    for index in USSDSession.__table__.indexes:
+        index.create(connection, checkfirst=True)
\ No newline at end of file
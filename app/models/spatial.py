@@ -0,0 +1,132 @@
+from app import db
+from app.regions import haversine_km
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from .resource import Resource
+import logging
+import math
+
+GEO_TABLE = 'resource_geo'
+
+# Ring search starts this wide and doubles until k candidates are provably nearest
+INITIAL_RING_KM = 10
+MAX_RING_KM = 1600  # wider than Nigeria, so the last ring sees every row
+
+KM_PER_DEGREE = 111.32
+
+# R*Tree mirror of resource coordinates; each resource is a zero-area box
+_INDEX_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {GEO_TABLE} USING rtree(
+        id, min_lat, max_lat, min_lon, max_lon
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {GEO_TABLE}_ai AFTER INSERT ON resources BEGIN
+        INSERT INTO {GEO_TABLE} VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {GEO_TABLE}_ad AFTER DELETE ON resources BEGIN
+        DELETE FROM {GEO_TABLE} WHERE id = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {GEO_TABLE}_au AFTER UPDATE OF latitude, longitude ON resources BEGIN
+        UPDATE {GEO_TABLE} SET min_lat = new.latitude, max_lat = new.latitude,
+            min_lon = new.longitude, max_lon = new.longitude WHERE id = new.id;
+    END"""
+]
+
+_geo = db.table(
+    GEO_TABLE,
+    db.column('id'), db.column('min_lat'), db.column('max_lat'), db.column('min_lon'), db.column('max_lon')
+)
+
+class ResourceGeoIndex:
+    """Bounding-box prefilter for coordinate searches, backed by an SQLite R*Tree"""
+    
+    # Engines known to have the index; callers fall back to ordering in SQL elsewhere
+    _indexed_engines = set()
+    
+    @classmethod
+    def is_available(cls):
+        engine = db.engine
+        if engine in cls._indexed_engines:
+            return True
+        if engine.dialect.name != 'sqlite':
+            return False
+        
+        exists = db.session.execute(
+            db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': GEO_TABLE}
+        ).first()
+        if exists:
+            cls._indexed_engines.add(engine)
+        return bool(exists)
+    
+    @staticmethod
+    def bounding_box(latitude, longitude, radius_km):
+        """(min_lat, max_lat, min_lon, max_lon) enclosing a circle of radius_km"""
+        lat_delta = radius_km / KM_PER_DEGREE
+        
+        # Size longitude on the box edge nearest a pole, where degrees are shortest
+        widest_lat = min(abs(latitude) + lat_delta, 89.0)
+        lon_delta = radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest_lat)))
+        return latitude - lat_delta, latitude + lat_delta, longitude - lon_delta, longitude + lon_delta
+    
+    @classmethod
+    def within(cls, query, latitude, longitude, radius_km):
+        """Restrict a Resource query to rows inside the bounding box of a circle"""
+        min_lat, max_lat, min_lon, max_lon = cls.bounding_box(latitude, longitude, radius_km)
+        return query.join(_geo, _geo.c.id == Resource.id).filter(
+            _geo.c.max_lat >= min_lat, _geo.c.min_lat <= max_lat,
+            _geo.c.max_lon >= min_lon, _geo.c.min_lon <= max_lon
+        )
+    
+    @classmethod
+    def nearest(cls, query, latitude, longitude, limit=5):
+        """The limit closest resources from a query, by exact Haversine distance"""
+        radius_km = INITIAL_RING_KM
+        while True:
+            ranked = cls._rank(cls.within(query, latitude, longitude, radius_km).all(), latitude, longitude)
+            
+            # Anything outside the box is further than radius_km, so hits inside the circle are final
+            settled = sum(1 for resource, distance in ranked if distance <= radius_km)
+            if settled >= limit or radius_km >= MAX_RING_KM:
+                return [resource for resource, distance in ranked[:limit]]
+            radius_km *= 2
+    
+    @staticmethod
+    def _rank(resources, latitude, longitude):
+        ranked = [
+            (resource, haversine_km(latitude, longitude, resource.latitude, resource.longitude))
+            for resource in resources
+        ]
+        ranked.sort(key=lambda pair: pair[1])
+        return ranked
+    
+    @classmethod
+    def install(cls, connection):
+        """Create the index and its triggers, populating it from existing rows on first install"""
+        if connection.dialect.name != 'sqlite':
+            return
+        
+        existed = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (GEO_TABLE,)
+        ).first()
+        
+        try:
+            for statement in _INDEX_DDL:
+                connection.exec_driver_sql(statement)
+        except OperationalError as e:
+            logging.warning(f"Resource spatial index unavailable, ranking without prefilter: {str(e)}")
+            return
+        
+        if not existed:
+            connection.exec_driver_sql(
+                f"INSERT INTO {GEO_TABLE} SELECT id, latitude, latitude, longitude, longitude FROM resources"
+            )
+
+@event.listens_for(db.metadata, 'after_create')
+def _install_geo_index(target, connection, **kw):
+    ResourceGeoIndex.install(connection)
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_geo_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {GEO_TABLE}")
+        ResourceGeoIndex._indexed_engines.discard(connection.engine)
@@ -0,0 +1,51 @@
+from app import db
+from datetime import datetime
+from app.regions import region_for
+from .resource import ResourceType, normalize_location
+
+class WaitlistEntry(db.Model):
+    """Index of PENDING requests waiting for capacity, keyed by type and area"""
+    __tablename__ = 'waitlist_entries'
+    __table_args__ = (
+        db.Index('ix_waitlist_type_area', 'resource_type', 'area_key', 'created_at'),
+        db.Index('ix_waitlist_region', 'region_key'),
+    )
+    
+    request_id = db.Column(db.Integer, db.ForeignKey('emergency_requests.id'), primary_key=True)
+    resource_type = db.Column(db.Enum(ResourceType), nullable=False)
+    area_key = db.Column(db.String(200), nullable=False)  # normalized caller location
+    region_key = db.Column(db.String(20))  # state partition, see app.regions
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    request = db.relationship('EmergencyRequest', lazy='joined')
+    
+    def __repr__(self):
+        return f'<WaitlistEntry {self.request_id} - {self.resource_type.value} @ {self.area_key}>'
+    
+    @staticmethod
+    def area_keys_for(location_key):
+        """All contiguous word runs of a resource location a caller could have typed"""
+        words = (location_key or '').split()
+        return {
+            ' '.join(words[start:end])
+            for start in range(len(words))
+            for end in range(start + 1, len(words) + 1)
+        }
+    
+    @classmethod
+    def delete_for(cls, request_ids):
+        """Drop the entries of requests that have left PENDING; does not commit"""
+        if request_ids:
+            db.session.execute(
+                db.delete(cls).where(cls.request_id.in_(list(request_ids))),
+                execution_options={'synchronize_session': False}
+            )
+    
+    @classmethod
+    def for_request(cls, request):
+        return cls(
+            request=request,
+            resource_type=request.resource_type,
+            area_key=normalize_location(request.location),
+            region_key=region_for(request.latitude, request.longitude, request.location)
+        )
@@ -0,0 +1,104 @@
+"""State-level region keys used to partition resources, waitlist entries and request rollups.
+
+Regions are approximated by the nearest state capital, which is accurate
+enough to keep a caller's queries inside their state and its neighbours.
+Requests themselves carry no region; per-region request counts come from
+the rollups.
+"""
+import math
+import re
+
+# region key: (state name, capital, capital latitude, capital longitude)
+STATES = {
+    'abia': ('Abia', 'Umuahia', 5.5320, 7.4860),
+    'adamawa': ('Adamawa', 'Yola', 9.2035, 12.4954),
+    'akwa_ibom': ('Akwa Ibom', 'Uyo', 5.0377, 7.9128),
+    'anambra': ('Anambra', 'Awka', 6.2109, 7.0742),
+    'bauchi': ('Bauchi', 'Bauchi', 10.3158, 9.8442),
+    'bayelsa': ('Bayelsa', 'Yenagoa', 4.9267, 6.2676),
+    'benue': ('Benue', 'Makurdi', 7.7337, 8.5214),
+    'borno': ('Borno', 'Maiduguri', 11.8311, 13.1510),
+    'cross_river': ('Cross River', 'Calabar', 4.9757, 8.3417),
+    'delta': ('Delta', 'Asaba', 6.1985, 6.7319),
+    'ebonyi': ('Ebonyi', 'Abakaliki', 6.3249, 8.1137),
+    'edo': ('Edo', 'Benin City', 6.3350, 5.6037),
+    'ekiti': ('Ekiti', 'Ado Ekiti', 7.6211, 5.2214),
+    'enugu': ('Enugu', 'Enugu', 6.4584, 7.5464),
+    'fct': ('FCT', 'Abuja', 9.0765, 7.3986),
+    'gombe': ('Gombe', 'Gombe', 10.2897, 11.1673),
+    'imo': ('Imo', 'Owerri', 5.4850, 7.0350),
+    'jigawa': ('Jigawa', 'Dutse', 11.7564, 9.3388),
+    'kaduna': ('Kaduna', 'Kaduna', 10.5105, 7.4165),
+    'kano': ('Kano', 'Kano', 12.0022, 8.5920),
+    'katsina': ('Katsina', 'Katsina', 12.9908, 7.6018),
+    'kebbi': ('Kebbi', 'Birnin Kebbi', 12.4539, 4.1975),
+    'kogi': ('Kogi', 'Lokoja', 7.8023, 6.7333),
+    'kwara': ('Kwara', 'Ilorin', 8.4966, 4.5421),
+    'lagos': ('Lagos', 'Ikeja', 6.6018, 3.3515),
+    'nasarawa': ('Nasarawa', 'Lafia', 8.4939, 8.5153),
+    'niger': ('Niger', 'Minna', 9.5836, 6.5463),
+    'ogun': ('Ogun', 'Abeokuta', 7.1475, 3.3619),
+    'ondo': ('Ondo', 'Akure', 7.2571, 5.2058),
+    'osun': ('Osun', 'Osogbo', 7.7827, 4.5418),
+    'oyo': ('Oyo', 'Ibadan', 7.3775, 3.9470),
+    'plateau': ('Plateau', 'Jos', 9.8965, 8.8583),
+    'rivers': ('Rivers', 'Port Harcourt', 4.8156, 7.0498),
+    'sokoto': ('Sokoto', 'Sokoto', 13.0059, 5.2476),
+    'taraba': ('Taraba', 'Jalingo', 8.8937, 11.3596),
+    'yobe': ('Yobe', 'Damaturu', 11.7470, 11.9608),
+    'zamfara': ('Zamfara', 'Gusau', 12.1628, 6.6614),
+}
+
+# Capitals closer than this are treated as neighbouring partitions
+NEIGHBOUR_RADIUS_KM = 200
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * math.asin(math.sqrt(a)) * 6371
+
+def _phrase(text):
+    return ' '.join(re.findall(r'[a-z0-9]+', text.lower()))
+
+# Place names a caller might type, longest first so "benin city" wins over "benin"
+_PLACE_NAMES = sorted(
+    [(_phrase(name), key) for key, (name, _, _, _) in STATES.items()] +
+    [(_phrase(capital), key) for key, (_, capital, _, _) in STATES.items()] +
+    [('abuja', 'fct')],
+    key=lambda item: -len(item[0])
+)
+
+def region_for_coordinates(latitude, longitude):
+    """Region key of the nearest state capital, or None for missing coordinates"""
+    if latitude is None or longitude is None or (latitude == 0 and longitude == 0):
+        return None
+    return min(
+        STATES,
+        key=lambda key: haversine_km(latitude, longitude, STATES[key][2], STATES[key][3])
+    )
+
+def region_for_location(text):
+    """Region key for a typed location that names a state or state capital"""
+    padded = f" {_phrase(text or '')} "
+    for phrase, key in _PLACE_NAMES:
+        if f" {phrase} " in padded:
+            return key
+    return None
+
+def region_for(latitude=None, longitude=None, location=None):
+    return region_for_coordinates(latitude, longitude) or region_for_location(location)
+
+def _build_neighbours():
+    neighbours = {}
+    for key, (_, _, lat, lon) in STATES.items():
+        neighbours[key] = [key] + sorted(
+            other for other, (_, _, other_lat, other_lon) in STATES.items()
+            if other != key and haversine_km(lat, lon, other_lat, other_lon) <= NEIGHBOUR_RADIUS_KM
+        )
+    return neighbours
+
+NEIGHBOURS = _build_neighbours()
+
+def region_with_neighbours(region_key):
+    """The partition keys a query from this region should read"""
+    return NEIGHBOURS.get(region_key, [region_key])
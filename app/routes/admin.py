@@ -1,50 +1,73 @@
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for
+from flask import Blueprint, Response, current_app, render_template, request, jsonify, redirect, url_for
 from app import db
-from app.models import Resource, ResourceType, EmergencyRequest, User
-from app.services import MatchingService
+from app.events import event_bus
+from app.models import Resource, ResourceType, EmergencyRequest, User, ResourceSearch
+from app.services.json_cache import json_response
+from app.services.registry import get_service
+from app.regions import STATES
+from sqlalchemy.orm import joinedload
 from datetime import datetime
 
 admin_bp = Blueprint('admin', __name__)
-matching_service = MatchingService()
 
 @admin_bp.route('/')
 def dashboard():
     """Admin dashboard"""
-    # Get statistics
-    total_resources = Resource.query.filter_by(is_active=True).count()
-    total_requests = EmergencyRequest.query.count()
-    pending_requests = EmergencyRequest.query.filter_by(status='pending').count()
+    snapshot = get_service('dashboard').get_snapshot()
     
     # Get recent requests
-    recent_requests = EmergencyRequest.query.order_by(
+    recent_requests = EmergencyRequest.query.options(
+        joinedload(EmergencyRequest.user)
+    ).order_by(
         EmergencyRequest.created_at.desc()
     ).limit(10).all()
     
-    # Get resource statistics by type
-    shelter_stats = matching_service.get_resource_statistics(ResourceType.SHELTER)
-    food_stats = matching_service.get_resource_statistics(ResourceType.FOOD)
-    transport_stats = matching_service.get_resource_statistics(ResourceType.TRANSPORT)
-    
     return render_template('admin/dashboard.html',
-                         total_resources=total_resources,
-                         total_requests=total_requests,
-                         pending_requests=pending_requests,
+                         total_resources=snapshot['total_resources'],
+                         total_requests=snapshot['total_requests'],
+                         pending_requests=snapshot['pending_requests'],
                          recent_requests=recent_requests,
-                         shelter_stats=shelter_stats,
-                         food_stats=food_stats,
-                         transport_stats=transport_stats)
+                         shelter_stats=snapshot['resources']['shelter'],
+                         food_stats=snapshot['resources']['food'],
+                         transport_stats=snapshot['resources']['transport'])
+
+@admin_bp.route('/stream')
+def stream():
+    """Server-sent event feed of dashboard deltas"""
+    # Each open stream holds a worker, so cap them and end each after a while
+    dashboard_feed = get_service('dashboard_feed')
+    subscriber = dashboard_feed.subscribe(current_app.config.get('DASHBOARD_STREAM_MAX_CLIENTS', 4))
+    if subscriber is None:
+        response = Response('Too many dashboard streams\n', status=503, mimetype='text/plain')
+        response.headers['Retry-After'] = '30'
+        return response
+    
+    response = Response(
+        dashboard_feed.stream(subscriber, current_app.config.get('DASHBOARD_STREAM_MAX_SECONDS', 120)),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @admin_bp.route('/resources')
 def resources():
     """Manage resources"""
     page = request.args.get('page', 1, type=int)
     resource_type = request.args.get('type')
+    search = request.args.get('q')
     
     query = Resource.query
     if resource_type:
         query = query.filter_by(resource_type=ResourceType(resource_type))
     
-    resources = query.order_by(Resource.created_at.desc()).paginate(
+    # Searches are ordered by relevance, plain listings newest first
+    if search:
+        query = ResourceSearch.apply(query, search).order_by(Resource.created_at.desc())
+    else:
+        query = query.order_by(Resource.created_at.desc())
+    
+    resources = query.paginate(
         page=page, per_page=20, error_out=False
     )
     
@@ -68,12 +91,14 @@ def add_resource():
                 contact_phone=request.form.get('contact_phone'),
                 organization=request.form.get('organization')
             )
+            resource.refresh_features()
             
             db.session.add(resource)
             db.session.commit()
+            event_bus.publish('capacity_changed', resource_id=resource.id)
             
             return redirect(url_for('admin.resources'))
-            
+        
         except Exception as e:
             return jsonify({'error': str(e)}), 400
     
@@ -99,11 +124,13 @@ def edit_resource(resource_id):
             resource.organization = request.form.get('organization')
             resource.is_active = 'is_active' in request.form
             resource.updated_at = datetime.utcnow()
+            resource.refresh_features()
             
             db.session.commit()
+            event_bus.publish('capacity_changed', resource_id=resource.id)
             
             return redirect(url_for('admin.resources'))
-            
+        
         except Exception as e:
             return jsonify({'error': str(e)}), 400
     
@@ -128,23 +155,22 @@ def requests():
 @admin_bp.route('/api/resources', methods=['GET'])
 def api_resources():
     """API endpoint for resources"""
-    resources = Resource.query.filter_by(is_active=True).all()
-    return jsonify([resource.to_dict() for resource in resources])
+    query = Resource.query.filter_by(is_active=True)
+    return json_response(get_service('json_cache').serialize_query(Resource, query))
 
 @admin_bp.route('/api/requests', methods=['GET'])
 def api_requests():
     """API endpoint for requests"""
-    requests = EmergencyRequest.query.order_by(
+    query = EmergencyRequest.query.order_by(
         EmergencyRequest.created_at.desc()
-    ).limit(50).all()
-    return jsonify([req.to_dict() for req in requests])
+    ).limit(50)
+    return json_response(get_service('json_cache').serialize_query(EmergencyRequest, query))
 
 @admin_bp.route('/api/stats', methods=['GET'])
 def api_stats():
     """API endpoint for statistics"""
-    return jsonify({
-        'shelter': matching_service.get_resource_statistics(ResourceType.SHELTER),
-        'food': matching_service.get_resource_statistics(ResourceType.FOOD),
-        'transport': matching_service.get_resource_statistics(ResourceType.TRANSPORT),
-        'overall': matching_service.get_resource_statistics()
-    })
\ No newline at end of file
+    region = request.args.get('region')
+    if region and region not in STATES:
+        return jsonify({'error': 'Invalid region'}), 400
+    
+    return jsonify(get_service('dashboard').get_snapshot(region)['resources'])
\ No newline at end of file
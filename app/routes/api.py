@@ -1,18 +1,23 @@
 from flask import Blueprint, request, jsonify
 from app import db
-from app.models import Resource, ResourceType, EmergencyRequest, User
-from app.services import MatchingService, SMSService
+from app.events import event_bus
+from app.models import Resource, ResourceType, EmergencyRequest, User, RequestRollup, ResourceSearch, LatencyHistogram, WaitlistEntry
+from app.models.latency import STAGES
+from app.models.request import RequestStatus
+from app.models.rollup import GRANULARITIES
+from app.services.registry import get_service
+from app.services.json_cache import json_response
+from app.regions import STATES
 from datetime import datetime
 
 api_bp = Blueprint('api', __name__)
-matching_service = MatchingService()
-sms_service = SMSService()
 
 @api_bp.route('/resources', methods=['GET'])
 def get_resources():
     """Get all active resources"""
     resource_type = request.args.get('type')
     location = request.args.get('location')
+    search = request.args.get('q')
     
     query = Resource.query.filter_by(is_active=True)
     
@@ -23,10 +28,13 @@ def get_resources():
             return jsonify({'error': 'Invalid resource type'}), 400
     
     if location:
-        query = query.filter(Resource.location.ilike(f'%{location}%'))
+        query = ResourceSearch.apply(query, location, column='location', ranked=False)
     
-    resources = query.all()
-    return jsonify([resource.to_dict() for resource in resources])
+    # Ranked prefix search over name, description, location and organization
+    if search:
+        query = ResourceSearch.apply(query, search)
+    
+    return json_response(get_service('json_cache').serialize_query(Resource, query))
 
 @api_bp.route('/resources/<int:resource_id>', methods=['GET'])
 def get_resource(resource_id):
@@ -53,9 +61,11 @@ def create_resource():
             contact_phone=data.get('contact_phone'),
             organization=data.get('organization')
         )
+        resource.refresh_features()
         
         db.session.add(resource)
         db.session.commit()
+        event_bus.publish('capacity_changed', resource_id=resource.id)
         
         return jsonify(resource.to_dict()), 201
         
@@ -83,8 +93,10 @@ def update_resource(resource_id):
         resource.organization = data.get('organization', resource.organization)
         resource.is_active = data.get('is_active', resource.is_active)
         resource.updated_at = datetime.utcnow()
+        resource.refresh_features()
         
         db.session.commit()
+        event_bus.publish('capacity_changed', resource_id=resource.id)
         
         return jsonify(resource.to_dict())
         
@@ -109,8 +121,8 @@ def get_requests():
         else:
             return jsonify([])
     
-    requests = query.order_by(EmergencyRequest.created_at.desc()).limit(100).all()
-    return jsonify([req.to_dict() for req in requests])
+    query = query.order_by(EmergencyRequest.created_at.desc()).limit(100)
+    return json_response(get_service('json_cache').serialize_query(EmergencyRequest, query))
 
 @api_bp.route('/requests/<int:request_id>', methods=['GET'])
 def get_request(request_id):
@@ -125,22 +137,54 @@ def update_request_status(request_id):
         req = EmergencyRequest.query.get_or_404(request_id)
         data = request.get_json()
         
-        new_status = data.get('status')
-        if not new_status:
+        if not data.get('status'):
             return jsonify({'error': 'Status is required'}), 400
         
+        try:
+            new_status = RequestStatus(data['status'])
+        except ValueError:
+            return jsonify({'error': 'Invalid status'}), 400
+        
+        if not req.can_transition_to(new_status):
+            return jsonify({'error': f'Cannot change status from {req.status.value} to {new_status.value}'}), 400
+        
+        if (req.status or RequestStatus.PENDING) == RequestStatus.PENDING:
+            WaitlistEntry.delete_for([req.id])
         req.update_status(new_status)
         db.session.commit()
         
         # Send SMS notification
-        status_message = f"Your request has been updated to: {new_status}"
-        sms_service.send_status_update(req.user, req, status_message)
+        status_message = f"Your request has been updated to: {new_status.value}"
+        get_service('sms').send_status_update(req.user, req, status_message)
         
         return jsonify(req.to_dict())
         
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@api_bp.route('/requests/status', methods=['PUT'])
+def bulk_update_request_status():
+    """Update the status of many requests selected by ID list and/or filter"""
+    try:
+        data = request.get_json() or {}
+        
+        if not data.get('status'):
+            return jsonify({'error': 'Status is required'}), 400
+        
+        result = get_service('requests').bulk_update_status(
+            data['status'],
+            ids=data.get('ids'),
+            filters=data.get('filter'),
+            notify=data.get('notify', True),
+            status_message=data.get('message')
+        )
+        
+        return jsonify(result)
+        
+    except (ValueError, TypeError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
 @api_bp.route('/search', methods=['POST'])
 def search_resources():
     """Search for resources based on criteria"""
@@ -152,16 +196,20 @@ def search_resources():
         latitude = data.get('latitude')
         longitude = data.get('longitude')
         limit = data.get('limit', 5)
+        region = data.get('region')
+        if region and region not in STATES:
+            return jsonify({'error': 'Invalid region'}), 400
         
-        resources = matching_service.find_nearby_resources(
+        resources = get_service('matching').find_nearby_resources(
             resource_type=resource_type,
             location=location,
             latitude=latitude,
             longitude=longitude,
-            limit=limit
+            limit=limit,
+            region=region
         )
         
-        return jsonify([resource.to_dict() for resource in resources])
+        return json_response(get_service('json_cache').serialize_objects(resources))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -169,11 +217,95 @@ def search_resources():
 @api_bp.route('/stats', methods=['GET'])
 def get_statistics():
     """Get system statistics"""
+    region = request.args.get('region')
+    if region and region not in STATES:
+        return jsonify({'error': 'Invalid region'}), 400
+    
+    return jsonify(get_service('dashboard').get_snapshot(region)['resources'])
+
+@api_bp.route('/stats/timeseries', methods=['GET'])
+def get_timeseries():
+    """Get request volume per time bucket from the rollup tables"""
+    try:
+        granularity = request.args.get('granularity', 'hour')
+        if granularity not in GRANULARITIES:
+            return jsonify({'error': 'Invalid granularity'}), 400
+        
+        start = request.args.get('start')
+        end = request.args.get('end')
+        resource_type = request.args.get('type')
+        status = request.args.get('status')
+        group_by = [name for name in request.args.get('group_by', 'resource_type').split(',') if name]
+        
+        if any(name not in ('resource_type', 'status', 'region', 'location') for name in group_by):
+            return jsonify({'error': 'Invalid group_by dimension'}), 400
+        
+        series = RequestRollup.series(
+            granularity=granularity,
+            start=datetime.fromisoformat(start) if start else None,
+            end=datetime.fromisoformat(end) if end else None,
+            resource_type=ResourceType(resource_type) if resource_type else None,
+            status=RequestStatus(status) if status else None,
+            region=request.args.get('region'),
+            location=request.args.get('location'),
+            group_by=group_by
+        )
+        
+        return jsonify({
+            'granularity': granularity,
+            'group_by': group_by,
+            'series': series
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@api_bp.route('/stats/latency', methods=['GET'])
+def get_latency():
+    """Get request lifecycle latency histograms (time to match, time to complete)"""
+    try:
+        stage = request.args.get('stage')
+        if stage and stage not in STAGES:
+            return jsonify({'error': 'Invalid stage'}), 400
+        
+        region = request.args.get('region')
+        if region and region not in STATES:
+            return jsonify({'error': 'Invalid region'}), 400
+        
+        resource_type = request.args.get('type')
+        group_by = [name for name in request.args.get('group_by', 'resource_type').split(',') if name]
+        if any(name not in ('resource_type', 'region') for name in group_by):
+            return jsonify({'error': 'Invalid group_by dimension'}), 400
+        
+        return jsonify({
+            'group_by': group_by,
+            'histograms': LatencyHistogram.summary(
+                stage=stage,
+                resource_type=ResourceType(resource_type) if resource_type else None,
+                region=region,
+                group_by=group_by
+            )
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Get operational metrics for caches and external dependencies"""
+    match_cache = get_service('matching').match_cache
+    
     return jsonify({
-        'shelter': matching_service.get_resource_statistics(ResourceType.SHELTER),
-        'food': matching_service.get_resource_statistics(ResourceType.FOOD),
-        'transport': matching_service.get_resource_statistics(ResourceType.TRANSPORT),
-        'overall': matching_service.get_resource_statistics()
+        'sms_gateway': get_service('sms').metrics(),
+        'match_cache': match_cache.stats() if match_cache else None,
+        'resource_snapshot': get_service('snapshot').stats(),
+        'json_cache': get_service('json_cache').stats(),
+        'ussd_admission': get_service('admission').stats(),
+        'ussd_rate_limits': get_service('rate_limiter').stats(),
+        'lifecycle_latency': [
+            {key: value for key, value in histogram.items() if key != 'buckets'}
+            for histogram in LatencyHistogram.summary()
+        ]
     })
 
 @api_bp.route('/alert', methods=['POST'])
@@ -185,8 +317,11 @@ def send_alert():
         resource_type = ResourceType(data['resource_type'])
         location = data['location']
         message = data['message']
+        region = data.get('region')
+        if region and region not in STATES:
+            return jsonify({'error': 'Invalid region'}), 400
         
-        sent_count = sms_service.send_resource_alert(resource_type, location, message)
+        sent_count = get_service('sms').send_resource_alert(resource_type, location, message, region=region)
         
         return jsonify({
             'success': True,
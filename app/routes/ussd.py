@@ -1,9 +1,21 @@
 from flask import Blueprint, request, jsonify
-from app.services import USSDService
+from app.services.registry import get_service
 import logging
 
 ussd_bp = Blueprint('ussd', __name__)
-ussd_service = USSDService()
+
+# Served to shed hops without touching the database
+BUSY_RESPONSE = {
+    'message': 'Network busy. Please redial in a moment.',
+    'continueSession': False,
+    'action': 'end'
+}
+
+RATE_LIMITED_RESPONSE = {
+    'message': 'Too many requests from this number. Please wait a minute and redial.',
+    'continueSession': False,
+    'action': 'end'
+}
 
 @ussd_bp.route('/callback', methods=['POST'])
 def ussd_callback():
@@ -22,8 +34,19 @@ def ussd_callback():
                 'error': 'Missing required parameters: phoneNumber and sessionId'
             }), 400
         
-        # Process USSD request
-        response = ussd_service.process_ussd_request(phone_number, session_id, user_input)
+        # Over-limit numbers and sessions are turned away before any user or session lookup
+        if not get_service('rate_limiter').allow('callback', phone_number, session_id):
+            return jsonify(RATE_LIMITED_RESPONSE)
+        
+        # Admit hops of sessions near confirmation first; shed new dials when saturated
+        admission = get_service('admission')
+        with admission.admit(admission.classify(session_id, user_input)) as admitted:
+            if not admitted:
+                return jsonify(BUSY_RESPONSE)
+            
+            # Process USSD request
+            response, menu = get_service('ussd').process_hop(phone_number, session_id, user_input)
+        admission.track(session_id, menu)
         
         # Format response for telecom provider
         # Different providers may expect different response formats
@@ -58,7 +81,13 @@ def test_ussd():
         session_id = data.get('session_id', 'test_session_123')
         user_input = data.get('input', '')
         
-        response = ussd_service.process_ussd_request(phone_number, session_id, user_input)
+        if not get_service('rate_limiter').allow('test', phone_number, session_id):
+            return jsonify({
+                'success': False,
+                'error': 'Rate limit exceeded'
+            }), 429
+        
+        response = get_service('ussd').process_ussd_request(phone_number, session_id, user_input)
         
         return jsonify({
             'success': True,
@@ -75,7 +104,12 @@ def test_ussd():
 @ussd_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
+    sms_gateway = get_service('sms').metrics()
+    
+    # USSD keeps serving while SMS is down, so an open breaker only degrades health
     return jsonify({
-        'status': 'healthy',
-        'service': 'USSD Gateway'
+        'status': 'healthy' if sms_gateway['state'] == 'closed' else 'degraded',
+        'service': 'USSD Gateway',
+        'sms_gateway': sms_gateway,
+        'admission': get_service('admission').stats()
     })
\ No newline at end of file
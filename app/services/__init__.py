@@ -1,5 +1,19 @@
-from .ussd_service import USSDService
-from .matching_service import MatchingService
-from .sms_service import SMSService
+import importlib
 
-__all__ = ['USSDService', 'MatchingService', 'SMSService']
\ No newline at end of file
+# Service classes are resolved on first access so importing the package stays cheap
+_EXPORTS = {
+    'USSDService': 'ussd_service',
+    'MatchingService': 'matching_service',
+    'SMSService': 'sms_service',
+    'WaitlistService': 'waitlist_service',
+    'RequestStatusService': 'request_status_service',
+    'CapacityReconciler': 'capacity_reconciler'
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        module = importlib.import_module(f'.{_EXPORTS[name]}', __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
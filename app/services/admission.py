@@ -0,0 +1,147 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+import heapq
+import itertools
+import threading
+
+# Hop priorities: finishing a journey beats continuing one, which beats starting one
+NEW_SESSION = 0
+CONTINUING = 1
+CONFIRMING = 2
+
+PRIORITY_NAMES = {
+    NEW_SESSION: 'new_session',
+    CONTINUING: 'continuing',
+    CONFIRMING: 'confirming'
+}
+
+class _Waiter:
+    __slots__ = ('priority', 'event', 'admitted')
+    
+    def __init__(self, priority):
+        self.priority = priority
+        self.event = threading.Event()
+        self.admitted = False
+
+class AdmissionController:
+    """Bounded in-flight USSD hops with a priority queue that sheds new dials before live sessions"""
+    
+    def __init__(self, max_in_flight=16, max_queue=64, queue_timeout=2.0, max_sessions=100000):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_sessions = max_sessions
+        
+        # New dials may only fill a quarter of the queue, so a surge sheds them first
+        self.queue_limits = {
+            NEW_SESSION: max_queue // 4,
+            CONTINUING: max_queue,
+            CONFIRMING: max_queue
+        }
+        
+        self.in_flight = 0
+        self.completed = 0
+        self.admitted = dict.fromkeys(PRIORITY_NAMES, 0)
+        self.shed = dict.fromkeys(PRIORITY_NAMES, 0)
+        self._waiters = []  # heap of (-priority, arrival, waiter)
+        self._arrivals = itertools.count()
+        self._sessions = OrderedDict()  # session_id -> menu the next hop will be handled in
+        self._lock = threading.Lock()
+    
+    def classify(self, session_id, user_input):
+        """Priority of a hop from the menu its session was left in, without touching the database"""
+        menu = self._sessions.get(session_id)
+        if menu == 'confirm':
+            return CONFIRMING
+        # Input on an unseen session means another worker served its earlier hops
+        if menu is not None or user_input:
+            return CONTINUING
+        return NEW_SESSION
+    
+    def track(self, session_id, menu):
+        """Remember where a session was left; menu is None once it has ended"""
+        with self._lock:
+            if menu is None:
+                self._sessions.pop(session_id, None)
+                return
+            self._sessions[session_id] = menu
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+    
+    @contextmanager
+    def admit(self, priority):
+        """Yield True once the hop may run, or False if it was shed"""
+        admitted = self.acquire(priority)
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self.release()
+    
+    def acquire(self, priority):
+        with self._lock:
+            if self.in_flight < self.max_in_flight:
+                self.in_flight += 1
+                self.admitted[priority] += 1
+                return True
+            
+            if len(self._waiters) >= self.queue_limits[priority] and not self._evict_below(priority):
+                self.shed[priority] += 1
+                return False
+            
+            waiter = _Waiter(priority)
+            heapq.heappush(self._waiters, (-priority, next(self._arrivals), waiter))
+        
+        if waiter.event.wait(self.queue_timeout):
+            return waiter.admitted
+        
+        with self._lock:
+            # Admitted or evicted while the timeout fired; the waiter's flag is final either way
+            if waiter.event.is_set():
+                return waiter.admitted
+            self._remove(waiter)
+            self.shed[priority] += 1
+            return False
+    
+    def release(self):
+        """Finish a hop, handing its slot straight to the highest-priority waiter"""
+        with self._lock:
+            self.completed += 1
+            if self._waiters:
+                _, _, waiter = heapq.heappop(self._waiters)
+                waiter.admitted = True
+                self.admitted[waiter.priority] += 1
+                waiter.event.set()
+            else:
+                self.in_flight -= 1
+    
+    def stats(self):
+        return {
+            'in_flight': self.in_flight,
+            'queued': len(self._waiters),
+            'max_in_flight': self.max_in_flight,
+            'max_queue': self.max_queue,
+            'completed': self.completed,
+            'admitted': {PRIORITY_NAMES[priority]: count for priority, count in self.admitted.items()},
+            'shed': {PRIORITY_NAMES[priority]: count for priority, count in self.shed.items()}
+        }
+    
+    def _evict_below(self, priority):
+        """Shed the newest waiter of the lowest priority below this one to make room; False if none"""
+        if not self._waiters:
+            return False
+        
+        entry = max(self._waiters)
+        waiter = entry[2]
+        if waiter.priority >= priority:
+            return False
+        
+        self._remove(waiter)
+        self.shed[waiter.priority] += 1
+        waiter.event.set()
+        return True
+    
+    def _remove(self, waiter):
+        self._waiters = [entry for entry in self._waiters if entry[2] is not waiter]
+        heapq.heapify(self._waiters)
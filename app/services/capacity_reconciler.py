@@ -0,0 +1,97 @@
+from app import db
+from app.events import event_bus
+from app.models import Resource, EmergencyRequest
+from app.models.request import ACTIVE_STATUSES
+from sqlalchemy import bindparam, case, func
+
+class CapacityReconciler:
+    """Compare stored available capacity against occupancy derived from active requests"""
+    
+    def occupancy_subquery(self):
+        """Seats held by active requests per resource, in one grouped scan of emergency_requests"""
+        return db.select(
+            EmergencyRequest.resource_id.label('resource_id'),
+            func.sum(func.coalesce(EmergencyRequest.people_count, 1)).label('occupied')
+        ).where(
+            EmergencyRequest.resource_id.isnot(None),
+            db.or_(EmergencyRequest.status.in_(ACTIVE_STATUSES), EmergencyRequest.status.is_(None))
+        ).group_by(EmergencyRequest.resource_id).subquery()
+    
+    def find_drift(self):
+        """Rows whose stored available_capacity differs from total_capacity minus occupancy"""
+        occupancy = self.occupancy_subquery()
+        occupied = func.coalesce(occupancy.c.occupied, 0)
+        remaining = func.coalesce(Resource.total_capacity, 0) - occupied
+        expected = case((remaining < 0, 0), else_=remaining)
+        
+        return db.session.execute(
+            db.select(
+                Resource.id,
+                Resource.name,
+                Resource.resource_type,
+                Resource.is_active,
+                Resource.total_capacity,
+                Resource.available_capacity,
+                occupied.label('occupied'),
+                expected.label('expected_available')
+            ).outerjoin(
+                occupancy, occupancy.c.resource_id == Resource.id
+            ).where(
+                func.coalesce(Resource.available_capacity, 0) != expected
+            ).order_by(Resource.id)
+        ).all()
+    
+    def reconcile(self, repair=False):
+        """Report drift, and with repair=True overwrite the drifted capacities in one batched UPDATE"""
+        drifted = self.find_drift()
+        repaired = self.repair(drifted) if repair and drifted else 0
+        
+        return {
+            'checked': db.session.query(func.count(Resource.id)).scalar(),
+            'drifted': len(drifted),
+            'total_drift': sum(abs((row.available_capacity or 0) - row.expected_available) for row in drifted),
+            'repaired': repaired,
+            'resources': [
+                {
+                    'resource_id': row.id,
+                    'name': row.name,
+                    'total_capacity': row.total_capacity,
+                    'available_capacity': row.available_capacity,
+                    'occupied': row.occupied,
+                    'expected_available': row.expected_available,
+                    'drift': (row.available_capacity or 0) - row.expected_available
+                }
+                for row in drifted
+            ]
+        }
+    
+    def repair(self, drifted):
+        """Write expected capacities, skipping rows that changed since they were read; commits"""
+        table = Resource.__table__
+        result = db.session.execute(
+            table.update().where(
+                table.c.id == bindparam('b_id'),
+                table.c.available_capacity == bindparam('b_seen')
+            ).values(available_capacity=bindparam('b_expected')),
+            [
+                {'b_id': row.id, 'b_seen': row.available_capacity, 'b_expected': row.expected_available}
+                for row in drifted
+            ]
+        )
+        
+        # The batched UPDATE bypasses the Resource mapper hooks, so announce the changes here
+        for row in drifted:
+            before = after = None
+            if row.is_active:
+                before = {
+                    'resource_type': row.resource_type.value,
+                    'total_capacity': row.total_capacity or 0,
+                    'available_capacity': row.available_capacity or 0
+                }
+                after = dict(before, available_capacity=row.expected_available)
+            event_bus.publish_on_commit('resource_changed', resource_id=row.id, before=before, after=after)
+            if row.expected_available > (row.available_capacity or 0):
+                event_bus.publish_on_commit('capacity_changed', resource_id=row.id)
+        
+        db.session.commit()
+        return result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(drifted)
@@ -0,0 +1,107 @@
+from datetime import datetime
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the breaker is open"""
+    pass
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with half-open probing and exponential backoff"""
+    
+    def __init__(self, failure_threshold=5, reset_timeout=5, max_reset_timeout=300, on_close=None):
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.on_close = on_close
+        self.state = CLOSED
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.rejected_calls = 0
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+    
+    def allow(self):
+        """Return True if a call may go through; at most one probe runs while half-open"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            
+            self.rejected_calls += 1
+            return False
+    
+    def check(self):
+        """Raise CircuitOpenError unless a call may go through"""
+        if not self.allow():
+            raise CircuitOpenError(f"circuit open, retry in {self.retry_in():.1f}s")
+    
+    def record_success(self):
+        with self._lock:
+            recovered = self.state != CLOSED
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.reset_timeout = self.base_reset_timeout
+            self.opened_at = None
+            self._probe_in_flight = False
+        
+        if recovered and self.on_close:
+            self.on_close()
+    
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            
+            if self.state == HALF_OPEN:
+                # Failed probe: stay open for longer before trying again
+                self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+                self._trip()
+            elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._trip()
+    
+    def _trip(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._probe_in_flight = False
+    
+    def retry_in(self):
+        """Seconds until the next probe is allowed (0 when closed)"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+    
+    def snapshot(self):
+        """Current state for health checks and metrics"""
+        retry_in = self.retry_in()
+        with self._lock:
+            opened_since = None
+            if self.opened_at is not None:
+                opened_since = datetime.utcfromtimestamp(
+                    time.time() - (time.monotonic() - self.opened_at)
+                ).isoformat()
+            
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.reset_timeout,
+                'retry_in': round(retry_in, 2),
+                'opened_since': opened_since,
+                'times_opened': self.times_opened,
+                'rejected_calls': self.rejected_calls
+            }
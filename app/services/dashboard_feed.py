@@ -0,0 +1,94 @@
+import functools
+import itertools
+import json
+import queue
+import threading
+import time
+
+# Event bus events forwarded to dashboards under the same name
+DELTA_EVENTS = ('request_created', 'request_status_changed', 'resource_changed')
+
+class DashboardFeed:
+    """Fan out model change events to connected dashboards as SSE deltas
+    
+    Deltas only cover changes committed by this worker process, so dashboards also
+    reload periodically to resync with the database.
+    """
+    
+    def __init__(self, max_queue_size=100, heartbeat_seconds=15):
+        self.max_queue_size = max_queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.rejected = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._event_ids = itertools.count(1)
+    
+    def connect(self, bus):
+        """Broadcast DELTA_EVENTS published on bus"""
+        for delta_type in DELTA_EVENTS:
+            bus.subscribe(delta_type, functools.partial(self.broadcast, delta_type))
+    
+    def subscribe(self, max_subscribers=None):
+        """Register a client queue; None when max_subscribers streams are already open"""
+        subscriber = queue.Queue(maxsize=self.max_queue_size)
+        with self._lock:
+            if max_subscribers is not None and len(self._subscribers) >= max_subscribers:
+                self.rejected += 1
+                return None
+            self._subscribers.add(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+    
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+    
+    def broadcast(self, delta_type, **data):
+        """Encode a delta once and queue it for every connected dashboard"""
+        frame = self.format_event(delta_type, data, next(self._event_ids))
+        
+        with self._lock:
+            subscribers = list(self._subscribers)
+        
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(frame)
+            except queue.Full:
+                # A stalled client has missed deltas; ask it to reload instead
+                self._reset(subscriber)
+    
+    def stream(self, subscriber, max_seconds=None):
+        """Yield SSE frames for one client until it disconnects or max_seconds pass
+        
+        Ending the stream frees the worker serving it; the browser reconnects on its own.
+        """
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                timeout = self.heartbeat_seconds
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    timeout = min(timeout, remaining)
+                try:
+                    yield subscriber.get(timeout=timeout)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+        finally:
+            self.unsubscribe(subscriber)
+    
+    def format_event(self, delta_type, data, event_id):
+        return f"id: {event_id}\nevent: {delta_type}\ndata: {json.dumps(data)}\n\n"
+    
+    def _reset(self, subscriber):
+        while True:
+            try:
+                subscriber.get_nowait()
+            except queue.Empty:
+                break
+        subscriber.put_nowait(self.format_event('resync', {}, next(self._event_ids)))
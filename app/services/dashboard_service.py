@@ -0,0 +1,123 @@
+from app import db
+from app.models import Resource, ResourceType, ResourceFeatures, EmergencyRequest, RequestRollup
+from app.models.request import RequestStatus
+from flask import current_app
+from sqlalchemy import func
+from datetime import datetime
+import threading
+import time
+
+def build_resource_stats(total_resources, total_capacity, available_capacity):
+    """Shape aggregate numbers like MatchingService.get_resource_statistics"""
+    return {
+        'total_resources': total_resources,
+        'total_capacity': total_capacity,
+        'available_capacity': available_capacity,
+        'utilization_rate': (total_capacity - available_capacity) / max(total_capacity, 1) * 100
+    }
+
+class SnapshotEntry:
+    """One cached snapshot with its own expiry and refresh lock"""
+    
+    def __init__(self):
+        self.snapshot = None
+        self.expires_at = 0
+        self.refresh_lock = threading.Lock()
+
+class DashboardService:
+    """Headline numbers for the dashboard and stats APIs, cached with a short TTL"""
+    
+    def __init__(self, ttl_seconds=None):
+        self.ttl_seconds = ttl_seconds
+        # Keyed by region (None for national); each warms and expires on its own
+        self._entries = {}
+        self._entries_lock = threading.Lock()
+    
+    def get_snapshot(self, region=None):
+        """Return the cached snapshot, letting only one caller refresh it at a time"""
+        entry = self._entries.get(region)
+        if entry is None:
+            with self._entries_lock:
+                entry = self._entries.setdefault(region, SnapshotEntry())
+        
+        if entry.snapshot is not None and time.monotonic() < entry.expires_at:
+            return entry.snapshot
+        
+        # Callers that find a refresh in progress serve the stale snapshot if there is one
+        if not entry.refresh_lock.acquire(blocking=entry.snapshot is None):
+            return entry.snapshot
+        
+        try:
+            if entry.snapshot is None or time.monotonic() >= entry.expires_at:
+                entry.snapshot = self.compute_snapshot(region)
+                entry.expires_at = time.monotonic() + self._ttl()
+            return entry.snapshot
+        finally:
+            entry.refresh_lock.release()
+    
+    def invalidate(self, region=None):
+        entry = self._entries.get(region)
+        if entry is not None:
+            entry.expires_at = 0
+    
+    def compute_snapshot(self, region=None):
+        """Aggregate every headline number with one grouped query per table"""
+        resource_query = db.session.query(
+            Resource.resource_type,
+            func.count(Resource.id),
+            func.coalesce(func.sum(Resource.total_capacity), 0),
+            func.coalesce(func.sum(Resource.available_capacity), 0)
+        ).filter(
+            Resource.is_active == True
+        )
+        
+        if region:
+            resource_query = resource_query.outerjoin(ResourceFeatures).filter(
+                ResourceFeatures.region_key == region
+            )
+            # Requests carry no region column; the day rollups are already partitioned
+            request_rows = db.session.query(
+                RequestRollup.status,
+                func.sum(RequestRollup.count)
+            ).filter(
+                RequestRollup.granularity == 'day',
+                RequestRollup.region_key == region
+            ).group_by(RequestRollup.status).all()
+        else:
+            request_rows = db.session.query(
+                EmergencyRequest.status,
+                func.count(EmergencyRequest.id)
+            ).group_by(EmergencyRequest.status).all()
+        
+        resource_rows = resource_query.group_by(Resource.resource_type).all()
+        
+        by_type = {row[0]: row[1:] for row in resource_rows}
+        resources = {
+            resource_type.value: build_resource_stats(*by_type.get(resource_type, (0, 0, 0)))
+            for resource_type in ResourceType
+        }
+        resources['overall'] = build_resource_stats(
+            sum(row[1] for row in resource_rows),
+            sum(row[2] for row in resource_rows),
+            sum(row[3] for row in resource_rows)
+        )
+        
+        requests_by_status = {status.value: 0 for status in RequestStatus}
+        for status, count in request_rows:
+            if status is not None:
+                requests_by_status[status.value] = int(count)
+        
+        return {
+            'region': region,
+            'total_resources': resources['overall']['total_resources'],
+            'total_requests': sum(requests_by_status.values()),
+            'pending_requests': requests_by_status[RequestStatus.PENDING.value],
+            'requests_by_status': requests_by_status,
+            'resources': resources,
+            'generated_at': datetime.utcnow().isoformat()
+        }
+    
+    def _ttl(self):
+        if self.ttl_seconds is not None:
+            return self.ttl_seconds
+        return current_app.config.get('DASHBOARD_SNAPSHOT_TTL', 5)
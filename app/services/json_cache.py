@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from flask import current_app
+import json
+import threading
+
+try:
+    import orjson
+except ImportError:  # stdlib encoder; same output, just slower
+    orjson = None
+
+# Keep IN lists well under SQLite's bound-parameter limit
+LOAD_CHUNK_SIZE = 500
+
+def encode_json(value):
+    """Compact JSON bytes with sorted keys, the same document jsonify would produce"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(value, sort_keys=True, separators=(',', ':')).encode()
+
+def json_response(body):
+    """Wrap pre-encoded JSON bytes the way jsonify wraps its output"""
+    return current_app.response_class(body + b'\n', mimetype='application/json')
+
+class JSONFragmentCache:
+    """Encoded to_dict() bytes per row, reused until one of the row's version columns changes
+    
+    Models opt in with a SERIALIZATION_VERSION tuple naming the columns that change
+    whenever to_dict() would (updated_at for resources).
+    """
+    
+    def __init__(self, max_entries=50000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (model name, id) -> (version, encoded bytes)
+        self._lock = threading.Lock()
+    
+    def serialize_query(self, model, query):
+        """JSON array of a query's rows in order; full rows are loaded only for cache misses"""
+        version_columns = [getattr(model, name) for name in model.SERIALIZATION_VERSION]
+        keys = query.with_entities(model.id, *version_columns).all()
+        
+        fragments = {}
+        missing = []
+        for row in keys:
+            fragment = self._lookup(model, row[0], tuple(row[1:]))
+            if fragment is None:
+                missing.append(row[0])
+            else:
+                fragments[row[0]] = fragment
+        
+        for start in range(0, len(missing), LOAD_CHUNK_SIZE):
+            chunk = missing[start:start + LOAD_CHUNK_SIZE]
+            for instance in model.query.filter(model.id.in_(chunk)).all():
+                fragments[instance.id] = self._store(instance)
+        
+        # Rows deleted between the two queries are simply left out
+        return b'[' + b','.join(fragments[row[0]] for row in keys if row[0] in fragments) + b']'
+    
+    def serialize_objects(self, instances):
+        """JSON array of already-loaded instances, encoding only those not cached at their version"""
+        fragments = []
+        for instance in instances:
+            fragment = self._lookup(type(instance), instance.id, self._version(instance))
+            fragments.append(fragment if fragment is not None else self._store(instance))
+        return b'[' + b','.join(fragments) + b']'
+    
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'encoder': 'orjson' if orjson is not None else 'json'
+        }
+    
+    @staticmethod
+    def _version(instance):
+        return tuple(getattr(instance, name) for name in instance.SERIALIZATION_VERSION)
+    
+    def _lookup(self, model, instance_id, version):
+        key = (model.__name__, instance_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def _store(self, instance):
+        fragment = encode_json(instance.to_dict())
+        key = (type(instance).__name__, instance.id)
+        with self._lock:
+            self._entries[key] = (self._version(instance), fragment)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fragment
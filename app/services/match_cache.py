@@ -0,0 +1,126 @@
+from app.models.resource import normalize_location
+from collections import OrderedDict, defaultdict
+import threading
+import time
+
+# Callers within the same ~1 km grid cell share coordinate-based matches
+COORDINATE_CELL_DEGREES = 0.01
+
+def match_key(resource_type, location, latitude=None, longitude=None, limit=5):
+    """Cache key for a match lookup: a coordinate cell when known, else the normalized place name"""
+    if latitude and longitude:
+        place = ('cell', round(latitude / COORDINATE_CELL_DEGREES), round(longitude / COORDINATE_CELL_DEGREES))
+    else:
+        place = ('name', normalize_location(location))
+    return (resource_type.value, place, limit)
+
+def cell_center(key):
+    """Coordinates every caller in a cell is matched from, so the cached result is deterministic"""
+    kind, lat_cell, lon_cell = key[1]
+    return lat_cell * COORDINATE_CELL_DEGREES, lon_cell * COORDINATE_CELL_DEGREES
+
+class MatchEntry:
+    """Cached resource IDs for one key, with a lock so only one caller recomputes"""
+    
+    def __init__(self):
+        self.resource_ids = None
+        self.expires_at = 0
+        self.generation = 0
+        self.compute_lock = threading.Lock()
+
+class MatchCache:
+    """Short-TTL cache of match results with single-flight recompute and per-resource invalidation"""
+    
+    def __init__(self, ttl_seconds=5, max_entries=10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._keys_by_resource = defaultdict(set)
+        self._lock = threading.Lock()
+    
+    def get_or_compute(self, key, compute):
+        """Return cached resource IDs for key, or run compute() once for all concurrent callers"""
+        entry = self._entry(key)
+        
+        if entry.resource_ids is not None and time.monotonic() < entry.expires_at:
+            self.hits += 1
+            return entry.resource_ids
+        
+        with entry.compute_lock:
+            # Another caller may have refreshed the entry while we waited
+            if entry.resource_ids is not None and time.monotonic() < entry.expires_at:
+                self.hits += 1
+                return entry.resource_ids
+            
+            self.misses += 1
+            generation = entry.generation
+            resource_ids = compute()
+            
+            with self._lock:
+                self._unindex(key, entry)
+                entry.resource_ids = resource_ids
+                # An invalidation during compute means this result may already be stale
+                entry.expires_at = time.monotonic() + self.ttl_seconds if entry.generation == generation else 0
+                if self._entries.get(key) is entry:
+                    for resource_id in resource_ids:
+                        self._keys_by_resource[resource_id].add(key)
+            
+            return resource_ids
+    
+    def invalidate_resource(self, resource_id):
+        """Expire every cached result that contains this resource"""
+        with self._lock:
+            for key in self._keys_by_resource.pop(resource_id, ()):
+                self._expire(key)
+    
+    def invalidate_type(self, resource_type_value):
+        """Expire every cached result for a resource type, e.g. when a new resource appears"""
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == resource_type_value:
+                    self._expire(key)
+    
+    def invalidate_key(self, key):
+        with self._lock:
+            self._expire(key)
+    
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._expire(key)
+    
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'ttl_seconds': self.ttl_seconds
+        }
+    
+    def _entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = MatchEntry()
+                if len(self._entries) > self.max_entries:
+                    old_key, old_entry = self._entries.popitem(last=False)
+                    self._unindex(old_key, old_entry)
+            else:
+                self._entries.move_to_end(key)
+            return entry
+    
+    def _expire(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.expires_at = 0
+            entry.generation += 1
+    
+    def _unindex(self, key, entry):
+        for resource_id in entry.resource_ids or ():
+            keys = self._keys_by_resource.get(resource_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_resource[resource_id]
@@ -1,14 +1,59 @@
-from app.models import Resource, ResourceType
+from app import db
+from app.events import event_bus
+from app.models import Resource, ResourceType, ResourceFeatures, ResourceSearch, ResourceGeoIndex
+from app.models.resource import normalize_location
+from app.regions import region_for, region_with_neighbours
+from app.services.match_cache import match_key, cell_center
 from sqlalchemy import func
 import math
 
 class MatchingService:
-    def __init__(self):
-        pass
+    def __init__(self, match_cache=None, snapshot=None):
+        self.match_cache = match_cache
+        self.snapshot = snapshot
     
-    def find_nearby_resources(self, resource_type, location, latitude=None, longitude=None, limit=5):
+    def find_matches(self, resource_type, location, latitude=None, longitude=None, limit=5):
+        """find_nearby_resources through the short-TTL match cache, one query per place"""
+        if self.match_cache is None:
+            return self.find_nearby_resources(resource_type, location, latitude, longitude, limit)
+        
+        key = match_key(resource_type, location, latitude, longitude, limit)
+        if latitude and longitude:
+            latitude, longitude = cell_center(key)
+        
+        computed = []
+        def compute():
+            computed.extend(self.find_nearby_resources(resource_type, location, latitude, longitude, limit))
+            return [resource.id for resource in computed]
+        
+        resource_ids = self.match_cache.get_or_compute(key, compute)
+        if computed or not resource_ids:
+            return computed
+        
+        resources = {
+            resource.id: resource
+            for resource in Resource.query.filter(Resource.id.in_(resource_ids)).all()
+        }
+        matches = [resources[resource_id] for resource_id in resource_ids if resource_id in resources]
+        
+        # A change not yet seen by this worker: drop the entry and query afresh
+        if len(matches) != len(resource_ids) or not all(resource.has_capacity() for resource in matches):
+            self.match_cache.invalidate_key(key)
+            return self.find_nearby_resources(resource_type, location, latitude, longitude, limit)
+        return matches
+    
+    def find_nearby_resources(self, resource_type, location, latitude=None, longitude=None, limit=5, region=None):
         """Find nearby resources based on location"""
         
+        region = region or region_for(latitude, longitude, location)
+        
+        # Rank by distance from the shared snapshot, touching the database only to load the winners;
+        # text matches go to the search index below, which answers them faster than a scan
+        if latitude and longitude and self.snapshot is not None and self.snapshot.enabled:
+            resources = self.find_in_snapshot(resource_type, latitude, longitude, limit, region)
+            if resources is not None:
+                return resources
+        
         # Base query for active resources of the specified type with available capacity
         query = Resource.query.filter(
             Resource.resource_type == resource_type,
@@ -16,8 +61,19 @@ class MatchingService:
             Resource.available_capacity > 0
         )
         
+        # Only read the caller's region partition and its neighbours when it is known;
+        # resources without a features row have no known region and stay eligible
+        if region:
+            query = query.outerjoin(ResourceFeatures).filter(
+                ResourceFeatures.in_regions(region_with_neighbours(region))
+            )
+        
         # If coordinates are provided, use distance-based sorting
         if latitude and longitude:
+            # Prefilter with the spatial index, then rank the candidates by exact distance
+            if ResourceGeoIndex.is_available():
+                return ResourceGeoIndex.nearest(query, latitude, longitude, limit)
+            
             # Calculate distance using Haversine formula (approximate)
             query = query.order_by(
                 func.sqrt(
@@ -28,12 +84,30 @@ class MatchingService:
         else:
             # Simple text-based location matching
             # In a real implementation, you'd use geocoding services
-            query = query.filter(
-                Resource.location.ilike(f'%{location}%')
+            query = ResourceSearch.apply(
+                query, location, column='location', ranked=False
             ).order_by(Resource.available_capacity.desc())
         
         return query.limit(limit).all()
     
+    def find_in_snapshot(self, resource_type, latitude, longitude, limit=5, region=None):
+        """Snapshot-ranked nearest matches loaded by primary key, or None to fall back to a database search"""
+        regions = region_with_neighbours(region) if region else None
+        resource_ids = self.snapshot.nearest(resource_type, latitude, longitude, limit, regions)
+        
+        # An empty answer may just be a snapshot that predates a new resource
+        if not resource_ids:
+            return None
+        
+        resources = {
+            resource.id: resource
+            for resource in Resource.query.filter(Resource.id.in_(resource_ids)).all()
+        }
+        matches = [resources[resource_id] for resource_id in resource_ids if resource_id in resources]
+        if len(matches) != len(resource_ids) or not all(resource.has_capacity() for resource in matches):
+            return None
+        return matches
+    
     def calculate_distance(self, lat1, lon1, lat2, lon2):
         """Calculate distance between two points using Haversine formula"""
         if not all([lat1, lon1, lat2, lon2]):
@@ -79,6 +153,7 @@ class MatchingService:
     def calculate_resource_score(self, resource, user_location):
         """Calculate a score for resource matching"""
         score = 0
+        features = resource.features or ResourceFeatures.for_resource(resource)
         
         # Availability score (0-40 points)
         if resource.available_capacity > 0:
@@ -86,24 +161,17 @@ class MatchingService:
             score += capacity_ratio * 40
         
         # Location relevance score (0-30 points)
-        if user_location.lower() in resource.location.lower():
+        user_key = normalize_location(user_location)
+        if user_key and user_key in features.location_key:
             score += 30
-        elif any(word in resource.location.lower() for word in user_location.lower().split()):
+        elif features.location_tokens.intersection(user_key.split()):
             score += 15
         
         # Organization reliability score (0-20 points)
-        if resource.organization:
-            # Government and established NGOs get higher scores
-            if any(keyword in resource.organization.lower() for keyword in ['government', 'ministry', 'nema', 'red cross']):
-                score += 20
-            elif any(keyword in resource.organization.lower() for keyword in ['ngo', 'foundation', 'charity']):
-                score += 15
-            else:
-                score += 10
+        score += features.reliability_score
         
         # Contact availability score (0-10 points)
-        if resource.contact_phone:
-            score += 10
+        score += features.contact_score
         
         return score
     
@@ -112,21 +180,25 @@ class MatchingService:
         resource = Resource.query.get(resource_id)
         if resource:
             resource.available_capacity = new_capacity
+            event_bus.publish_on_commit('capacity_changed', resource_id=resource.id)
             return True
         return False
     
-    def get_resource_statistics(self, resource_type=None):
+    def get_resource_statistics(self, resource_type=None, region=None):
         """Get statistics about resource availability"""
-        query = Resource.query.filter(Resource.is_active == True)
+        query = db.session.query(
+            func.count(Resource.id),
+            func.coalesce(func.sum(Resource.total_capacity), 0),
+            func.coalesce(func.sum(Resource.available_capacity), 0)
+        ).filter(Resource.is_active == True)
         
         if resource_type:
             query = query.filter(Resource.resource_type == resource_type)
         
-        resources = query.all()
+        if region:
+            query = query.outerjoin(ResourceFeatures).filter(ResourceFeatures.region_key == region)
         
-        total_resources = len(resources)
-        total_capacity = sum(r.total_capacity for r in resources)
-        available_capacity = sum(r.available_capacity for r in resources)
+        total_resources, total_capacity, available_capacity = query.one()
         
         return {
             'total_resources': total_resources,
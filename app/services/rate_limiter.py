@@ -0,0 +1,73 @@
+import threading
+import time
+
+class TokenBucketLimiter:
+    """Token bucket per key, in lock-sharded tables with a bounded number of keys per shard"""
+    
+    def __init__(self, per_minute, burst, shards=16, max_keys=1000000):
+        self.rate = per_minute / 60.0
+        self.burst = float(burst)
+        self.max_per_shard = max(max_keys // shards, 1)
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+        # Refusals per shard, each counted under its shard's lock
+        self._limited = [0] * shards
+    
+    @property
+    def limited(self):
+        return sum(self._limited)
+    
+    def allow(self, key):
+        """Take one token for key; False when its bucket is empty"""
+        shard = hash(key) % len(self._shards)
+        buckets, lock = self._shards[shard]
+        now = time.monotonic()
+        with lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                # Evict the oldest key; it comes back with a full bucket, as an idle one would have
+                if len(buckets) >= self.max_per_shard:
+                    del buckets[next(iter(buckets))]
+                buckets[key] = [self.burst - 1, now]
+                return True
+            
+            tokens = bucket[0] + (now - bucket[1]) * self.rate
+            bucket[0] = tokens if tokens < self.burst else self.burst
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True
+            
+            self._limited[shard] += 1
+            return False
+    
+    def __len__(self):
+        return sum(len(buckets) for buckets, lock in self._shards)
+
+class RateLimiter:
+    """Per-endpoint limits on phone numbers and sessions, checked before any database work
+    
+    limits maps endpoint -> {'phone' | 'session': (requests per minute, burst)}.
+    """
+    
+    def __init__(self, limits, shards=16, max_keys=1000000):
+        self.limiters = {
+            (endpoint, kind): TokenBucketLimiter(per_minute, burst, shards=shards, max_keys=max_keys)
+            for endpoint, kinds in limits.items()
+            for kind, (per_minute, burst) in kinds.items()
+        }
+    
+    def allow(self, endpoint, phone_number=None, session_id=None):
+        phone_limiter = self.limiters.get((endpoint, 'phone'))
+        if phone_limiter is not None and phone_number and not phone_limiter.allow(phone_number):
+            return False
+        
+        session_limiter = self.limiters.get((endpoint, 'session'))
+        if session_limiter is not None and session_id and not session_limiter.allow(session_id):
+            return False
+        return True
+    
+    def stats(self):
+        return {
+            f'{endpoint}_{kind}': {'tracked': len(limiter), 'limited': limiter.limited}
+            for (endpoint, kind), limiter in self.limiters.items()
+        }
@@ -0,0 +1,157 @@
+from flask import current_app
+import threading
+
+class ServiceRegistry:
+    """App-scoped service container that builds each service on first use"""
+    
+    def __init__(self, app=None):
+        self._factories = {}
+        self._instances = {}
+        self._lock = threading.RLock()
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        app.extensions['services'] = self
+        self.register('snapshot', _make_resource_snapshot)
+        self.register('matching', _make_matching_service)
+        self.register('sms', _make_sms_service)
+        self.register('waitlist', _make_waitlist_service)
+        self.register('users', _make_user_directory)
+        self.register('ussd', _make_ussd_service)
+        self.register('requests', _make_request_status_service)
+        self.register('reconciler', _make_capacity_reconciler)
+        self.register('json_cache', _make_json_cache)
+        self.register('admission', _make_admission_controller)
+        self.register('rate_limiter', _make_rate_limiter)
+        self.register('dashboard', _make_dashboard_service)
+        self.register('dashboard_feed', _make_dashboard_feed)
+    
+    def register(self, name, factory):
+        """Register a factory taking the registry; replaces any built instance"""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+    
+    def get(self, name):
+        service = self._instances.get(name)
+        if service is None:
+            with self._lock:
+                service = self._instances.get(name)
+                if service is None:
+                    service = self._factories[name](self)
+                    self._instances[name] = service
+        return service
+
+def get_service(name):
+    """Return the named service for the current app, building it if needed"""
+    return current_app.extensions['services'].get(name)
+
+# Factories import their modules lazily so workers only pay for what they serve
+
+def _make_matching_service(registry):
+    from app.services.matching_service import MatchingService
+    from app.services.match_cache import MatchCache
+    return MatchingService(
+        match_cache=MatchCache(
+            ttl_seconds=current_app.config.get('MATCH_CACHE_TTL', 5),
+            max_entries=current_app.config.get('MATCH_CACHE_SIZE', 10000)
+        ),
+        snapshot=registry.get('snapshot')
+    )
+
+def _make_resource_snapshot(registry):
+    from app import db
+    from app.services.resource_snapshot import ResourceSnapshot, snapshot_path
+    return ResourceSnapshot(
+        snapshot_path(db.engine.url, current_app.config.get('RESOURCE_SNAPSHOT_DIR')),
+        max_age=current_app.config.get('RESOURCE_SNAPSHOT_MAX_AGE', 30)
+    )
+
+def _make_sms_service(registry):
+    from app.services.sms_service import SMSService
+    return SMSService()
+
+def _make_waitlist_service(registry):
+    from app.services.waitlist_service import WaitlistService
+    return WaitlistService(registry.get('sms'))
+
+def _make_user_directory(registry):
+    from app.services.user_directory import UserDirectory
+    directory = UserDirectory(
+        max_entries=current_app.config.get('USER_CACHE_SIZE', 100000),
+        flush_interval=current_app.config.get('LAST_ACTIVE_FLUSH_SECONDS', 30)
+    )
+    directory.start_background_flush(current_app._get_current_object())
+    return directory
+
+def _make_ussd_service(registry):
+    from app.services.ussd_service import USSDService
+    return USSDService(
+        matching_service=registry.get('matching'),
+        sms_service=registry.get('sms'),
+        waitlist_service=registry.get('waitlist'),
+        user_directory=registry.get('users'),
+        resume_minutes=current_app.config.get('USSD_RESUME_MINUTES', 5),
+        cumulative_text=current_app.config.get('USSD_CUMULATIVE_TEXT', False)
+    )
+
+def _make_request_status_service(registry):
+    from app.services.request_status_service import RequestStatusService
+    return RequestStatusService(registry.get('sms'))
+
+def _make_capacity_reconciler(registry):
+    from app.services.capacity_reconciler import CapacityReconciler
+    return CapacityReconciler()
+
+def _make_json_cache(registry):
+    from app.services.json_cache import JSONFragmentCache
+    return JSONFragmentCache(max_entries=current_app.config.get('JSON_CACHE_SIZE', 50000))
+
+def _make_admission_controller(registry):
+    from app.services.admission import AdmissionController
+    return AdmissionController(
+        max_in_flight=current_app.config.get('USSD_MAX_IN_FLIGHT', 16),
+        max_queue=current_app.config.get('USSD_MAX_QUEUE', 64),
+        queue_timeout=current_app.config.get('USSD_QUEUE_TIMEOUT', 2.0)
+    )
+
+def _make_rate_limiter(registry):
+    from app.services.rate_limiter import RateLimiter
+    return RateLimiter(
+        current_app.config.get('USSD_RATE_LIMITS', {}),
+        max_keys=current_app.config.get('RATE_LIMIT_MAX_KEYS', 1000000)
+    )
+
+def _make_dashboard_service(registry):
+    from app.services.dashboard_service import DashboardService
+    return DashboardService()
+
+def _make_dashboard_feed(registry):
+    from app.events import event_bus
+    from app.services.dashboard_feed import DashboardFeed
+    # Built on the first /admin/stream; until then there is nobody to send deltas to
+    feed = DashboardFeed()
+    feed.connect(event_bus)
+    return feed
+
+def wake_waitlist(resource_id):
+    get_service('waitlist').wake_for_resource(resource_id)
+
+def invalidate_matches(resource_id, before=None, after=None, moved=False, **payload):
+    """Drop cached matches containing a changed resource, or all of its type when it gains capacity or moves"""
+    match_cache = get_service('matching').match_cache
+    if match_cache is None:
+        return
+    
+    match_cache.invalidate_resource(resource_id)
+    if moved:
+        # It may now belong in results for places it was never cached under
+        for resource_type in {values['resource_type'] for values in (before, after) if values}:
+            match_cache.invalidate_type(resource_type)
+    elif after and after['available_capacity'] > 0 and not (before and before['available_capacity'] > 0):
+        match_cache.invalidate_type(after['resource_type'])
+
+def patch_snapshot(resource_id, before=None, after=None, moved=False, **payload):
+    """Write a resource's new capacity into the snapshot shared by every worker"""
+    get_service('snapshot').patch(resource_id, after, moved=moved)
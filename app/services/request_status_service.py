@@ -0,0 +1,192 @@
+from app import db
+from app.events import event_bus
+from app.models import EmergencyRequest, LatencyHistogram, RequestRollup, Resource, ResourceType, User, WaitlistEntry
+from app.models.latency import STAGES
+from app.models.request import ACTIVE_STATUSES, RequestStatus, STATUS_TIMESTAMPS
+from app.services.sms_templates import BULK_STATUS_UPDATE
+from datetime import datetime
+from sqlalchemy import bindparam, case, func
+
+# Keep IN lists well under SQLite's bound-parameter limit
+UPDATE_CHUNK_SIZE = 500
+
+class RequestStatusService:
+    """Validated status transitions applied to many requests with set-based UPDATEs"""
+    
+    def __init__(self, sms_service=None):
+        self.sms_service = sms_service
+    
+    def build_filters(self, ids=None, filters=None):
+        """WHERE clauses from an ID list and/or a filter dict; raises ValueError on bad values"""
+        filters = filters or {}
+        clauses = []
+        
+        if ids is not None:
+            clauses.append(EmergencyRequest.id.in_([int(request_id) for request_id in ids]))
+        if filters.get('resource_id') is not None:
+            clauses.append(EmergencyRequest.resource_id == int(filters['resource_id']))
+        if filters.get('resource_type'):
+            clauses.append(EmergencyRequest.resource_type == ResourceType(filters['resource_type']))
+        if filters.get('status'):
+            clauses.append(EmergencyRequest.status == RequestStatus(filters['status']))
+        if filters.get('location'):
+            clauses.append(EmergencyRequest.location.ilike(f"%{filters['location']}%"))
+        if filters.get('created_after'):
+            clauses.append(EmergencyRequest.created_at >= datetime.fromisoformat(filters['created_after']))
+        if filters.get('created_before'):
+            clauses.append(EmergencyRequest.created_at < datetime.fromisoformat(filters['created_before']))
+        
+        if not clauses:
+            raise ValueError('Provide ids or at least one filter')
+        return clauses
+    
+    def bulk_update_status(self, new_status, ids=None, filters=None, notify=True, status_message=None):
+        """Move every matching request that may legally enter new_status; return a summary"""
+        new_status = RequestStatus(new_status)
+        clauses = self.build_filters(ids, filters)
+        
+        candidates = db.session.execute(
+            db.select(
+                EmergencyRequest.id,
+                EmergencyRequest.user_id,
+                EmergencyRequest.status,
+                EmergencyRequest.resource_type,
+                EmergencyRequest.resource_id,
+                EmergencyRequest.people_count,
+                EmergencyRequest.location,
+                EmergencyRequest.latitude,
+                EmergencyRequest.longitude,
+                EmergencyRequest.created_at
+            ).where(*clauses)
+        ).all()
+        
+        by_status = {}
+        for row in candidates:
+            by_status.setdefault(row.status or RequestStatus.PENDING, []).append(row)
+        
+        values = {'status': new_status}
+        timestamp = STATUS_TIMESTAMPS.get(new_status)
+        if timestamp:
+            values[timestamp] = datetime.utcnow()
+        stage = next((stage for stage, column in STAGES.items() if column == timestamp), None)
+        
+        updated = []
+        connection = db.session.connection()
+        for old_status in EmergencyRequest.transition_sources(new_status):
+            rows = by_status.get(old_status, [])
+            for start in range(0, len(rows), UPDATE_CHUNK_SIZE):
+                chunk = rows[start:start + UPDATE_CHUNK_SIZE]
+                changed = self._update_chunk(chunk, old_status, values)
+                
+                # Bulk UPDATEs skip the mapper hooks, so mirror their rollup and event side effects
+                RequestRollup.record_transition(connection, changed, old_status, new_status)
+                if stage:
+                    LatencyHistogram.record_many(connection, changed, stage, values[timestamp])
+                if old_status == RequestStatus.PENDING:
+                    WaitlistEntry.delete_for([row.id for row in changed])
+                for row in changed:
+                    event_bus.publish_on_commit(
+                        'request_status_changed',
+                        request_id=row.id,
+                        resource_type=row.resource_type.value,
+                        old_status=old_status.value,
+                        new_status=new_status.value
+                    )
+                updated.extend(changed)
+        
+        if new_status not in ACTIVE_STATUSES:
+            self.release_capacity(updated)
+        
+        db.session.commit()
+        
+        updated_ids = {row.id for row in updated}
+        notified = 0
+        if notify and updated and self.sms_service:
+            notified = self.notify(updated, status_message or f"Your request has been updated to: {new_status.value}")
+        
+        return {
+            'status': new_status.value,
+            'updated': sorted(updated_ids),
+            'skipped': sorted(row.id for row in candidates if row.id not in updated_ids),
+            'notified': notified
+        }
+    
+    def _update_chunk(self, rows, old_status, values):
+        """UPDATE one chunk, guarded on the status it was read in; return the rows that changed"""
+        status_clause = EmergencyRequest.status == old_status
+        if old_status == RequestStatus.PENDING:
+            status_clause = db.or_(status_clause, EmergencyRequest.status.is_(None))
+        
+        statement = db.update(EmergencyRequest).where(
+            EmergencyRequest.id.in_([row.id for row in rows]),
+            status_clause
+        ).values(**values)
+        
+        if db.session.get_bind().dialect.update_returning:
+            changed_ids = set(db.session.execute(
+                statement.returning(EmergencyRequest.id),
+                execution_options={'synchronize_session': False}
+            ).scalars())
+            return [row for row in rows if row.id in changed_ids]
+        
+        db.session.execute(statement, execution_options={'synchronize_session': False})
+        return rows
+    
+    def release_capacity(self, rows):
+        """Give the seats held by requests leaving an active status back to their resources; does not commit"""
+        released = {}
+        for row in rows:
+            if row.resource_id is not None:
+                released[row.resource_id] = released.get(row.resource_id, 0) + (row.people_count or 1)
+        if not released:
+            return
+        
+        resources = db.session.execute(
+            db.select(
+                Resource.id,
+                Resource.resource_type,
+                Resource.is_active,
+                Resource.total_capacity,
+                Resource.available_capacity
+            ).where(Resource.id.in_(list(released)))
+        ).all()
+        
+        # One batched UPDATE, clamped to total capacity in SQL so concurrent changes are not overwritten
+        table = Resource.__table__
+        total = func.coalesce(table.c.total_capacity, 0)
+        raised = func.coalesce(table.c.available_capacity, 0) + bindparam('b_released')
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('b_id')).values(
+                available_capacity=case((raised > total, total), else_=raised)
+            ),
+            [{'b_id': row.id, 'b_released': released[row.id]} for row in resources]
+        )
+        
+        # The batched UPDATE bypasses the Resource mapper hooks, so announce the changes here
+        for row in resources:
+            available = row.available_capacity or 0
+            expected = min(available + released[row.id], row.total_capacity or 0)
+            before = after = None
+            if row.is_active:
+                before = {
+                    'resource_type': row.resource_type.value,
+                    'total_capacity': row.total_capacity or 0,
+                    'available_capacity': available
+                }
+                after = dict(before, available_capacity=expected)
+            event_bus.publish_on_commit('resource_changed', resource_id=row.id, before=before, after=after)
+            if expected > available:
+                event_bus.publish_on_commit('capacity_changed', resource_id=row.id)
+    
+    def notify(self, rows, status_message):
+        """Queue one shared status SMS per affected user as a single background bulk send; return messages queued"""
+        phone_numbers = [
+            phone_number for (phone_number,) in db.session.query(User.phone_number).filter(
+                User.id.in_({row.user_id for row in rows}),
+                User.phone_number.isnot(None)
+            ).all()
+        ]
+        
+        # No per-request ID in the body, so every recipient shares it and the gateway gets batches
+        body = self.sms_service.render(BULK_STATUS_UPDATE, status=status_message).body
+        return self.sms_service.send_many_later((phone_number, body) for phone_number in phone_numbers)
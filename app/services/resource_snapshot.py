@@ -0,0 +1,423 @@
+from app import db
+from app.models import Resource, ResourceFeatures, ResourceType, ResourceGeoIndex
+from app.models.spatial import INITIAL_RING_KM, MAX_RING_KM
+from app.regions import STATES, haversine_km, region_for
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from contextlib import contextmanager
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): every worker falls back to SQL matching
+    fcntl = None
+
+SNAPSHOT_MAGIC = b'RSN2'
+
+# magic, version (odd while a writer is mid-update), active slot, retired, stale, slot capacity, built_at
+_HEADER = struct.Struct('<4sQIIIId')
+_VERSION = struct.Struct('<Q')
+_VERSION_OFFSET = 4
+_ACTIVE_OFFSET = 12
+_RETIRED_OFFSET = 16
+_STALE_OFFSET = 20
+_BUILT_AT_OFFSET = 28
+HEADER_SIZE = 64
+
+SnapshotHeader = namedtuple('SnapshotHeader', 'magic version active retired stale capacity built_at')
+
+TYPES = list(ResourceType)
+REGIONS = sorted(STATES)  # stored as index + 1; 0 means no known region
+
+# Per slot: row count, then the (start, end) row range of each resource type
+_SLOT_HEADER = struct.Struct('<I' + 'II' * len(TYPES))
+SLOT_HEADER_SIZE = 64
+
+# Fixed-width columns, widest first so every typed view stays aligned
+COLUMNS = (
+    ('latitude', 'd', 8),
+    ('longitude', 'd', 8),
+    ('id', 'i', 4),
+    ('available', 'i', 4),
+    ('total', 'i', 4),
+    ('active', 'B', 1),
+    ('region', 'B', 1),
+    ('reliability', 'B', 1),
+    ('contact', 'B', 1),
+)
+ROW_SIZE = sum(width for name, code, width in COLUMNS)
+
+MIN_CAPACITY = 1024
+READ_ATTEMPTS = 5
+
+def snapshot_path(database_url, directory=None):
+    """Snapshot file shared by every worker on this database, or None for private in-memory databases"""
+    if fcntl is None or database_url.get_backend_name() == 'sqlite' and database_url.database in (None, '', ':memory:'):
+        return None
+    
+    if directory is None:
+        directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    digest = hashlib.sha1(database_url.render_as_string(hide_password=False).encode()).hexdigest()[:12]
+    return os.path.join(directory, f'resource_snapshot_{digest}.bin')
+
+def _slot_size(capacity):
+    return SLOT_HEADER_SIZE + capacity * ROW_SIZE
+
+class SnapshotSlot:
+    """Typed zero-copy views over one slot of the mapped file"""
+    
+    def __init__(self, buffer, offset, capacity):
+        self.header = buffer[offset:offset + SLOT_HEADER_SIZE]
+        self.columns = {}
+        position = offset + SLOT_HEADER_SIZE
+        for name, code, width in COLUMNS:
+            view = buffer[position:position + capacity * width]
+            self.columns[name] = view.cast(code)
+            position += capacity * width
+    
+    @property
+    def count(self):
+        return _SLOT_HEADER.unpack_from(self.header)[0]
+    
+    def type_range(self, resource_type):
+        ranges = _SLOT_HEADER.unpack_from(self.header)[1:]
+        index = TYPES.index(resource_type)
+        return ranges[2 * index], ranges[2 * index + 1]
+    
+    def write(self, rows):
+        """Fill the slot from rows sorted by (type, latitude)"""
+        columns = self.columns
+        ranges = {resource_type: [0, 0] for resource_type in TYPES}
+        for index, row in enumerate(rows):
+            row_range = ranges[row['resource_type']]
+            if row_range[1] == 0:
+                row_range[0] = index
+            row_range[1] = index + 1
+            
+            columns['latitude'][index] = row['latitude']
+            columns['longitude'][index] = row['longitude']
+            columns['id'][index] = row['id']
+            columns['available'][index] = max(row['available_capacity'], 0)
+            columns['total'][index] = max(row['total_capacity'], 0)
+            columns['active'][index] = 1 if row['is_active'] else 0
+            columns['region'][index] = REGIONS.index(row['region_key']) + 1 if row['region_key'] in STATES else 0
+            columns['reliability'][index] = row['reliability_score']
+            columns['contact'][index] = row['contact_score']
+        
+        flat_ranges = [bound for resource_type in TYPES for bound in ranges[resource_type]]
+        _SLOT_HEADER.pack_into(self.header, 0, len(rows), *flat_ranges)
+
+class ResourceSnapshot:
+    """Matching columns of every resource in a memory-mapped file shared by all workers on a box
+    
+    One worker at a time (whoever takes the file lock) rebuilds the inactive of two slots
+    and flips the active slot; the version counter works as a seqlock so readers never see
+    a half-written slot. Capacity changes are patched in place rather than rebuilt.
+    """
+    
+    def __init__(self, path, max_age=30):
+        self.path = path
+        self.max_age = max_age
+        self.rebuilds = 0
+        self.patches = 0
+        self.fallbacks = 0
+        self._mapped = None  # (mmap, slots); swapped whole so readers keep a consistent pair
+        self._positions = (None, {})
+    
+    @property
+    def enabled(self):
+        return bool(self.path)
+    
+    # Reading
+    
+    def nearest(self, resource_type, latitude, longitude, limit=5, regions=None):
+        """IDs of the closest resources with capacity, or None when the snapshot cannot answer"""
+        region_codes = self._region_codes(regions)
+        
+        def read(slot):
+            start, end = slot.type_range(resource_type)
+            latitudes, longitudes, ids = slot.columns['latitude'], slot.columns['longitude'], slot.columns['id']
+            radius_km = INITIAL_RING_KM
+            while True:
+                min_lat, max_lat, min_lon, max_lon = ResourceGeoIndex.bounding_box(latitude, longitude, radius_km)
+                ranked = [
+                    (haversine_km(latitude, longitude, latitudes[index], longitudes[index]), ids[index])
+                    for index in range(bisect_left(latitudes, min_lat, start, end), bisect_right(latitudes, max_lat, start, end))
+                    if min_lon <= longitudes[index] <= max_lon and self._eligible(slot, index, region_codes)
+                ]
+                ranked.sort()
+                
+                settled = sum(1 for distance, resource_id in ranked if distance <= radius_km)
+                if settled >= limit or radius_km >= MAX_RING_KM:
+                    return [resource_id for distance, resource_id in ranked[:limit]]
+                radius_km *= 2
+        
+        return self._read(read)
+    
+    def stats(self):
+        mapped = self._mapped
+        header = self._header(mapped[0]) if mapped else None
+        return {
+            'enabled': self.enabled,
+            'version': header.version if header else None,
+            'resources': mapped[1][header.active].count if header else 0,
+            'age_seconds': time.time() - header.built_at if header else None,
+            'rebuilds': self.rebuilds,
+            'patches': self.patches,
+            'fallbacks': self.fallbacks
+        }
+    
+    @staticmethod
+    def _region_codes(regions):
+        if not regions:
+            return None
+        return {0} | {REGIONS.index(region) + 1 for region in regions if region in STATES}
+    
+    @staticmethod
+    def _eligible(slot, index, region_codes):
+        columns = slot.columns
+        return (columns['active'][index] and columns['available'][index] > 0 and
+                (region_codes is None or columns['region'][index] in region_codes))
+    
+    def _read(self, reader):
+        """Run reader(slot) against a consistent slot, retrying if a writer flips or patches meanwhile"""
+        if not self.enabled:
+            return None
+        
+        for attempt in range(READ_ATTEMPTS):
+            mapped = self._current()
+            if mapped is None:
+                break
+            
+            mm, slots = mapped
+            header = self._header(mm)
+            if header.version % 2:
+                time.sleep(0)
+                continue
+            
+            result = reader(slots[header.active])
+            if _VERSION.unpack_from(mm, _VERSION_OFFSET)[0] == header.version:
+                return result
+        
+        self.fallbacks += 1
+        return None
+    
+    def _mapping(self):
+        """This worker's mapping of the live file, reopened after another worker swapped in a new one"""
+        mapped = self._mapped
+        if mapped is None or self._header(mapped[0]).retired:
+            mapped = self._mapped = self._open()
+        return mapped
+    
+    def _current(self):
+        """The mapping to read, rebuilt first when missing, stale or too old (unless another worker is)"""
+        mapped = self._mapping()
+        if mapped is None or self._needs_refresh(self._header(mapped[0])):
+            self.refresh(blocking=mapped is None)
+            mapped = self._mapped
+        return mapped
+    
+    def _needs_refresh(self, header):
+        return bool(header.stale) or time.time() - header.built_at > self.max_age
+    
+    # Writing
+    
+    def refresh(self, blocking=True, force=False):
+        """Rebuild from the database into the inactive slot and flip to it; False if another worker is"""
+        if not self.enabled:
+            return False
+        
+        with self._writer(blocking) as locked:
+            if not locked:
+                return False
+            
+            mapped = self._mapping()
+            if mapped is not None:
+                mm, slots = mapped
+                header = self._header(mm)
+                # Another worker may have rebuilt while this one waited for the lock
+                if not force and not self._needs_refresh(header):
+                    return True
+                # Cleared before reading, so a change announced mid-rebuild leaves it stale again
+                struct.pack_into('<I', mm, _STALE_OFFSET, 0)
+            
+            rows = self._load()
+            if mapped is None or len(rows) > self._header(mapped[0]).capacity:
+                self._create(rows)
+            else:
+                target = 1 - header.active
+                slots[target].write(rows)
+                version = self._begin_write(mm)
+                struct.pack_into('<I', mm, _ACTIVE_OFFSET, target)
+                struct.pack_into('<d', mm, _BUILT_AT_OFFSET, time.time())
+                self._end_write(mm, version)
+            
+            self.rebuilds += 1
+            return True
+    
+    def patch(self, resource_id, after, moved=False):
+        """Apply one resource's new capacity in place; after is None for an inactive resource"""
+        if not self.enabled:
+            return
+        
+        with self._writer(blocking=True):
+            # Nothing to patch before the first build, which will read the change from the database
+            mapped = self._mapping()
+            if mapped is None:
+                return
+            
+            mm, slots = mapped
+            header = self._header(mm)
+            slot = slots[header.active]
+            index = self._position(mm, header, slot, resource_id)
+            
+            # New resources, type changes and moves reorder rows or change their
+            # coordinates and region columns, which only a rebuild can do
+            if index is None or moved or (after and self._type_at(slot, index).value != after['resource_type']):
+                struct.pack_into('<I', mm, _STALE_OFFSET, 1)
+                return
+            
+            version = self._begin_write(mm)
+            slot.columns['active'][index] = 1 if after else 0
+            if after:
+                slot.columns['available'][index] = max(after['available_capacity'], 0)
+                slot.columns['total'][index] = max(after['total_capacity'], 0)
+            self._end_write(mm, version)
+            self.patches += 1
+    
+    def _position(self, mm, header, slot, resource_id):
+        # Rows only move on a rebuild, so the id -> row map holds until built_at changes
+        key = (id(mm), header.active, header.built_at)
+        cached_key, positions = self._positions
+        if cached_key != key:
+            positions = {resource_id: index for index, resource_id in enumerate(slot.columns['id'][:slot.count].tolist())}
+            self._positions = (key, positions)
+        return positions.get(resource_id)
+    
+    @staticmethod
+    def _type_at(slot, index):
+        for resource_type in TYPES:
+            start, end = slot.type_range(resource_type)
+            if start <= index < end:
+                return resource_type
+    
+    def _load(self):
+        """Matching columns for every resource, sorted by (type, latitude) for range scans"""
+        rows = db.session.query(
+            Resource.id,
+            Resource.resource_type,
+            Resource.latitude,
+            Resource.longitude,
+            Resource.total_capacity,
+            Resource.available_capacity,
+            Resource.is_active,
+            Resource.location,
+            Resource.organization,
+            Resource.contact_phone,
+            ResourceFeatures.resource_id.label('features_id'),
+            ResourceFeatures.region_key,
+            ResourceFeatures.reliability_score,
+            ResourceFeatures.contact_score
+        ).outerjoin(ResourceFeatures, ResourceFeatures.resource_id == Resource.id).all()
+        
+        loaded = []
+        for row in rows:
+            values = row._asdict()
+            values['total_capacity'] = values['total_capacity'] or 0
+            values['available_capacity'] = values['available_capacity'] or 0
+            if values['features_id'] is None:
+                values['region_key'] = region_for(row.latitude, row.longitude, row.location)
+                values['reliability_score'] = ResourceFeatures.reliability_for(row.organization)
+                values['contact_score'] = 10 if row.contact_phone else 0
+            values['reliability_score'] = values['reliability_score'] or 0
+            values['contact_score'] = values['contact_score'] or 0
+            loaded.append(values)
+        
+        loaded.sort(key=lambda values: (TYPES.index(values['resource_type']), values['latitude']))
+        return loaded
+    
+    def _create(self, rows):
+        """Write a larger file beside the old one and swap it in; readers of the old file reopen"""
+        capacity = MIN_CAPACITY
+        while capacity < 2 * len(rows):
+            capacity *= 2
+        
+        temporary = f'{self.path}.{os.getpid()}.tmp'
+        with open(temporary, 'w+b') as handle:
+            handle.truncate(HEADER_SIZE + 2 * _slot_size(capacity))
+            mm = mmap.mmap(handle.fileno(), 0)
+            buffer = memoryview(mm)
+            slot = SnapshotSlot(buffer, HEADER_SIZE, capacity)
+            slot.write(rows)
+            _HEADER.pack_into(mm, 0, SNAPSHOT_MAGIC, 2, 0, 0, 0, capacity, time.time())
+            
+            # Views must be released before the map can close
+            for view in list(slot.columns.values()) + [slot.header, buffer]:
+                view.release()
+            mm.close()
+        os.replace(temporary, self.path)
+        
+        if self._mapped is not None:
+            struct.pack_into('<I', self._mapped[0], _RETIRED_OFFSET, 1)
+        self._mapped = self._open()
+    
+    def _open(self):
+        """Map the current snapshot file, or None if there is none yet"""
+        try:
+            with open(self.path, 'r+b') as handle:
+                mm = mmap.mmap(handle.fileno(), 0)
+        except (FileNotFoundError, ValueError):
+            return None
+        
+        header = self._header(mm)
+        if header.magic != SNAPSHOT_MAGIC or len(mm) != HEADER_SIZE + 2 * _slot_size(header.capacity):
+            logging.warning(f"Ignoring unreadable resource snapshot at {self.path}")
+            mm.close()
+            return None
+        
+        buffer = memoryview(mm)
+        slots = tuple(
+            SnapshotSlot(buffer, HEADER_SIZE + slot * _slot_size(header.capacity), header.capacity)
+            for slot in range(2)
+        )
+        return mm, slots
+    
+    @contextmanager
+    def _writer(self, blocking):
+        """Hold the cross-process writer lock; yields False if busy and not blocking"""
+        with open(f'{self.path}.lock', 'a') as handle:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+    
+    @staticmethod
+    def _header(mm):
+        return SnapshotHeader(*_HEADER.unpack_from(mm, 0))
+    
+    @staticmethod
+    def _begin_write(mm):
+        """Make the version odd; callers hold the writer lock, so an odd version here was left by a writer that died"""
+        current = _VERSION.unpack_from(mm, _VERSION_OFFSET)[0]
+        if current % 2:
+            # Its half-written patch may linger in the active slot; the next reader rebuilds
+            logging.warning("Resource snapshot writer died mid-update; marking the snapshot stale")
+            struct.pack_into('<I', mm, _STALE_OFFSET, 1)
+        version = (current + 1) | 1
+        _VERSION.pack_into(mm, _VERSION_OFFSET, version)
+        return version
+    
+    @staticmethod
+    def _end_write(mm, version):
+        _VERSION.pack_into(mm, _VERSION_OFFSET, version + 1)
@@ -1,11 +1,32 @@
-import requests
 from flask import current_app
+from collections import defaultdict, deque
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED
+from app.services.sms_templates import (
+    CONFIRMATION, PROVIDER_ALERT, STATUS_UPDATE, WAITLIST_MATCH, segment_count, message_units
+)
 import logging
+import threading
 
 class SMSService:
     def __init__(self):
         self.api_key = current_app.config.get('SMS_API_KEY') if current_app else None
         self.gateway_url = current_app.config.get('SMS_GATEWAY_URL') if current_app else None
+        self.segment_budget = current_app.config.get('SMS_SEGMENT_BUDGET', 1) if current_app else 1
+        self.batch_size = current_app.config.get('SMS_GATEWAY_BATCH_SIZE', 1) if current_app else 1
+        self.timeout = current_app.config.get('SMS_GATEWAY_TIMEOUT', 10) if current_app else 10
+        config = current_app.config if current_app else {}
+        
+        # Fail fast while the gateway is down instead of waiting out the timeout on every send
+        self.breaker = CircuitBreaker(
+            failure_threshold=config.get('SMS_BREAKER_FAILURE_THRESHOLD', 5),
+            reset_timeout=config.get('SMS_BREAKER_RESET_SECONDS', 5),
+            max_reset_timeout=config.get('SMS_BREAKER_MAX_RESET_SECONDS', 300),
+            on_close=self._start_drain
+        )
+        self.deferred = deque(maxlen=config.get('SMS_DEFERRED_QUEUE_SIZE', 10000))
+        self.deferred_dropped = 0
+        self._deferred_lock = threading.Lock()
+        self._draining = False
     
     def send_sms(self, phone_number, message):
         """Send SMS message to phone number"""
@@ -23,73 +44,216 @@ class SMSService:
                 'api_key': self.api_key
             }
             
-            response = requests.post(self.gateway_url, json=payload, timeout=10)
-            
-            if response.status_code == 200:
+            if self._deliver(payload):
                 logging.info(f"SMS sent successfully to {phone_number}")
                 return True
-            else:
-                logging.error(f"Failed to send SMS to {phone_number}: {response.text}")
-                return False
+            return False
                 
         except Exception as e:
             logging.error(f"SMS sending error: {str(e)}")
             return False
     
+    def _deliver(self, payload):
+        """Post through the circuit breaker, deferring the payload if the gateway is unavailable"""
+        try:
+            self.breaker.check()
+        except CircuitOpenError:
+            self.defer(payload)
+            return False
+        
+        try:
+            status_code = self._post(payload)
+        except Exception as e:
+            logging.error(f"SMS gateway error: {str(e)}")
+            self.breaker.record_failure()
+            self.defer(payload)
+            return False
+        
+        if status_code == 200:
+            self.breaker.record_success()
+            # Payloads deferred by failures that never tripped the breaker get no recovery; retry them now
+            if self.deferred:
+                self._start_drain()
+            return True
+        
+        if status_code == 429 or status_code >= 500:
+            self.breaker.record_failure()
+            self.defer(payload)
+        else:
+            # The gateway answered; only this payload was rejected
+            self.breaker.record_success()
+        return False
+    
+    def _post(self, payload):
+        import requests
+        
+        encoding, _ = message_units(payload['message'])
+        logging.debug(f"SMS payload: {encoding}, {segment_count(payload['message'])} segment(s)")
+        
+        response = requests.post(self.gateway_url, json=payload, timeout=self.timeout)
+        
+        if response.status_code != 200:
+            logging.error(f"Failed to send SMS to {payload['to']}: {response.text}")
+        return response.status_code
+    
+    def defer(self, payload):
+        """Queue a payload for redelivery once the gateway recovers"""
+        with self._deferred_lock:
+            if len(self.deferred) == self.deferred.maxlen:
+                self.deferred_dropped += 1
+            self.deferred.append(payload)
+    
+    def flush_deferred(self):
+        """Retry deferred payloads while the breaker stays closed; return messages sent"""
+        sent = 0
+        for _ in range(len(self.deferred)):
+            if self.breaker.state != CLOSED:
+                break
+            
+            with self._deferred_lock:
+                if not self.deferred:
+                    break
+                payload = self.deferred.popleft()
+            
+            if self._deliver(payload):
+                sent += len(payload['to']) if isinstance(payload['to'], list) else 1
+        
+        return sent
+    
+    def _start_drain(self):
+        with self._deferred_lock:
+            if self._draining or not self.deferred:
+                return
+            self._draining = True
+        
+        threading.Thread(target=self._drain, daemon=True).start()
+    
+    def _drain(self):
+        try:
+            sent = self.flush_deferred()
+            logging.info(f"SMS gateway reachable, sent {sent} deferred message(s)")
+        finally:
+            with self._deferred_lock:
+                self._draining = False
+    
+    def metrics(self):
+        """Gateway breaker state and deferred queue depth"""
+        metrics = self.breaker.snapshot()
+        metrics.update({
+            'gateway_configured': bool(self.gateway_url and self.api_key),
+            'deferred': len(self.deferred),
+            'deferred_dropped': self.deferred_dropped
+        })
+        return metrics
+    
+    def render(self, template, **fields):
+        """Render a template within the configured segment budget"""
+        return template.render(max_segments=self.segment_budget, **fields)
+    
     def send_confirmation_sms(self, user, resource, request):
         """Send confirmation SMS to user"""
-        message = f"🚨 EMERGENCY RESPONSE CONFIRMED\n\n"
-        message += f"Service: {resource.name}\n"
-        message += f"Location: {resource.location}\n"
-        message += f"Contact: {resource.contact_phone}\n"
-        message += f"Request ID: {request.id}\n\n"
-        message += "Please proceed to the location. Show this SMS if needed."
+        message = self.render(
+            CONFIRMATION,
+            name=resource.name,
+            location=resource.location,
+            contact=resource.contact_phone,
+            request_id=request.id
+        )
+        
+        return self.send_sms(user.phone_number, message.body)
+    
+    def send_waitlist_match(self, user, resource, request):
+        """Tell a waitlisted user that capacity has been found for them"""
+        message = self.render(
+            WAITLIST_MATCH,
+            name=resource.name,
+            location=resource.location,
+            contact=resource.contact_phone,
+            request_id=request.id
+        )
         
-        return self.send_sms(user.phone_number, message)
+        return self.send_sms(user.phone_number, message.body)
     
     def send_provider_alert(self, resource, request):
         """Send alert to resource provider"""
         if not resource.contact_phone:
             return False
         
-        message = f"🚨 NEW EMERGENCY REQUEST\n\n"
-        message += f"Service: {resource.name}\n"
-        message += f"Requester: {request.user.phone_number}\n"
-        message += f"Location: {request.location}\n"
-        message += f"Type: {request.resource_type.value}\n"
-        message += f"Request ID: {request.id}\n\n"
-        message += "Please prepare to assist."
+        message = self.render(
+            PROVIDER_ALERT,
+            name=resource.name,
+            requester=request.user.phone_number,
+            location=request.location,
+            resource_type=request.resource_type.value,
+            request_id=request.id
+        )
         
-        return self.send_sms(resource.contact_phone, message)
+        return self.send_sms(resource.contact_phone, message.body)
     
     def send_status_update(self, user, request, status_message):
         """Send status update to user"""
-        message = f"🚨 REQUEST UPDATE\n\n"
-        message += f"Request ID: {request.id}\n"
-        message += f"Status: {status_message}\n\n"
-        message += "For assistance, call emergency services."
+        message = self.render(STATUS_UPDATE, request_id=request.id, status=status_message)
         
-        return self.send_sms(user.phone_number, message)
+        return self.send_sms(user.phone_number, message.body)
     
     def send_bulk_alert(self, phone_numbers, message):
         """Send bulk SMS alert"""
+        phone_numbers = list(phone_numbers)
+        
+        if self.batch_size <= 1 or not self.gateway_url or not self.api_key:
+            success_count = 0
+            for phone_number in phone_numbers:
+                if self.send_sms(phone_number, message):
+                    success_count += 1
+            
+            return success_count
+        
+        # Gateways with batch semantics take one body for many recipients per call
         success_count = 0
-        for phone_number in phone_numbers:
-            if self.send_sms(phone_number, message):
-                success_count += 1
+        for start in range(0, len(phone_numbers), self.batch_size):
+            batch = phone_numbers[start:start + self.batch_size]
+            if self._deliver({'to': batch, 'message': message, 'api_key': self.api_key}):
+                success_count += len(batch)
         
         return success_count
     
-    def send_resource_alert(self, resource_type, location, message):
+    def send_many(self, messages):
+        """Send (phone_number, body) pairs, grouping identical bodies into bulk sends"""
+        recipients = defaultdict(list)
+        for phone_number, body in messages:
+            recipients[body].append(phone_number)
+        
+        return sum(
+            self.send_bulk_alert(phone_numbers, body)
+            for body, phone_numbers in recipients.items()
+        )
+    
+    def send_many_later(self, messages):
+        """send_many on a background thread, so the caller never waits on the gateway; returns messages queued"""
+        messages = list(messages)
+        if messages:
+            threading.Thread(target=self.send_many, args=(messages,), daemon=True).start()
+        return len(messages)
+    
+    def send_resource_alert(self, resource_type, location, message, region=None):
         """Send alert to all resource providers of a specific type in a location"""
-        from app.models import Resource
+        from app.models import Resource, ResourceFeatures, ResourceSearch
+        from app.regions import region_for_location, region_with_neighbours
         
-        resources = Resource.query.filter(
+        query = Resource.query.filter(
             Resource.resource_type == resource_type,
             Resource.is_active == True,
-            Resource.location.ilike(f'%{location}%'),
             Resource.contact_phone.isnot(None)
-        ).all()
+        )
+        query = ResourceSearch.apply(query, location, column='location', ranked=False)
+        
+        region = region or region_for_location(location)
+        if region:
+            query = query.outerjoin(ResourceFeatures).filter(
+                ResourceFeatures.in_regions(region_with_neighbours(region))
+            )
+        
+        resources = query.all()
         
         phone_numbers = [r.contact_phone for r in resources if r.contact_phone]
         
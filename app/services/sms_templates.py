@@ -0,0 +1,159 @@
+from string import Formatter
+import math
+import unicodedata
+
+# GSM 03.38 basic character set and the extension table (each extension char costs two septets)
+GSM7_BASIC = set(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM7_EXTENSION = set("^{}\\[~]|€\f")
+
+# Common characters from phones and spreadsheets that have a close GSM-7 equivalent
+GSM7_REPLACEMENTS = {
+    '‘': "'", '’': "'", '“': '"', '”': '"',
+    '–': '-', '—': '-', '…': '...', ' ': ' ', '\t': ' '
+}
+
+GSM7_SINGLE_SEGMENT = 160
+GSM7_MULTI_SEGMENT = 153
+UCS2_SINGLE_SEGMENT = 70
+UCS2_MULTI_SEGMENT = 67
+
+def is_gsm7(text):
+    return all(char in GSM7_BASIC or char in GSM7_EXTENSION for char in text)
+
+def to_gsm7(text):
+    """Best-effort transliteration into GSM-7; characters with no equivalent are kept"""
+    if is_gsm7(text):
+        return text
+    
+    converted = []
+    for char in text:
+        if char in GSM7_BASIC or char in GSM7_EXTENSION:
+            converted.append(char)
+        elif char in GSM7_REPLACEMENTS:
+            converted.append(GSM7_REPLACEMENTS[char])
+        else:
+            stripped = unicodedata.normalize('NFKD', char).encode('ascii', 'ignore').decode('ascii')
+            converted.append(stripped if stripped else char)
+    return ''.join(converted)
+
+def message_units(text):
+    """Return (encoding, length in that encoding's units)"""
+    if is_gsm7(text):
+        return 'GSM-7', sum(2 if char in GSM7_EXTENSION else 1 for char in text)
+    return 'UCS-2', len(text.encode('utf-16-le')) // 2
+
+def segment_count(text):
+    encoding, units = message_units(text)
+    single, multi = (
+        (GSM7_SINGLE_SEGMENT, GSM7_MULTI_SEGMENT) if encoding == 'GSM-7'
+        else (UCS2_SINGLE_SEGMENT, UCS2_MULTI_SEGMENT)
+    )
+    if units <= single:
+        return 1
+    return math.ceil(units / multi)
+
+class RenderedMessage:
+    def __init__(self, template_name, body, variant):
+        self.template_name = template_name
+        self.body = body
+        self.variant = variant
+        self.encoding, self.length = message_units(body)
+        self.segments = segment_count(body)
+    
+    def __repr__(self):
+        return f'<RenderedMessage {self.template_name}[{self.variant}] {self.encoding} x{self.segments}>'
+    
+    def to_dict(self):
+        return {
+            'template': self.template_name,
+            'variant': self.variant,
+            'encoding': self.encoding,
+            'length': self.length,
+            'segments': self.segments
+        }
+
+class SMSTemplate:
+    """Message template with progressively shorter GSM-7 variants, compiled once"""
+    
+    def __init__(self, name, variants, truncatable=(), min_field_length=8):
+        self.name = name
+        self.truncatable = truncatable
+        self.min_field_length = min_field_length
+        self._variants = [self._compile(variant) for variant in variants]
+    
+    def _compile(self, text):
+        parts = []
+        for literal, field, _, _ in Formatter().parse(text):
+            if literal:
+                parts.append((False, literal))
+            if field is not None:
+                parts.append((True, field))
+        return parts
+    
+    @property
+    def fields(self):
+        return {value for variant in self._variants for is_field, value in variant if is_field}
+    
+    def _fill(self, variant, values):
+        return ''.join(values[value] if is_field else value for is_field, value in variant)
+    
+    def render(self, max_segments=1, **fields):
+        """Render the longest variant that fits the segment budget, truncating fields if none do"""
+        values = {name: to_gsm7('' if value is None else str(value)) for name, value in fields.items()}
+        
+        for index, variant in enumerate(self._variants):
+            body = self._fill(variant, values)
+            if segment_count(body) <= max_segments:
+                return RenderedMessage(self.name, body, index)
+        
+        # Shrink the longest truncatable field until the shortest variant fits
+        variant = self._variants[-1]
+        body = self._fill(variant, values)
+        while segment_count(body) > max_segments:
+            candidates = [name for name in self.truncatable if len(values[name]) > self.min_field_length]
+            if not candidates:
+                break
+            longest = max(candidates, key=lambda name: len(values[name]))
+            values[longest] = values[longest][:max(self.min_field_length, len(values[longest]) - 8) - 2] + '..'
+            body = self._fill(variant, values)
+        
+        return RenderedMessage(self.name, body, len(self._variants) - 1)
+
+CONFIRMATION = SMSTemplate('confirmation', [
+    "EMERGENCY RESPONSE CONFIRMED\n\n"
+    "Service: {name}\nLocation: {location}\nContact: {contact}\nRequest ID: {request_id}\n\n"
+    "Please proceed to the location. Show this SMS if needed.",
+    "CONFIRMED: {name}\nLoc: {location}\nTel: {contact}\nRef: {request_id}\n"
+    "Go to the location and show this SMS.",
+], truncatable=('name', 'location'))
+
+PROVIDER_ALERT = SMSTemplate('provider_alert', [
+    "NEW EMERGENCY REQUEST\n\n"
+    "Service: {name}\nRequester: {requester}\nLocation: {location}\nType: {resource_type}\n"
+    "Request ID: {request_id}\n\nPlease prepare to assist.",
+    "NEW REQUEST {request_id} ({resource_type})\nFor: {name}\nFrom: {requester}\nLoc: {location}\n"
+    "Please prepare to assist.",
+], truncatable=('name', 'location'))
+
+STATUS_UPDATE = SMSTemplate('status_update', [
+    "REQUEST UPDATE\n\nRequest ID: {request_id}\nStatus: {status}\n\n"
+    "For assistance, call emergency services.",
+    "Ref {request_id}: {status}\nFor help call emergency services.",
+], truncatable=('status',))
+
+# One body for every request closed out together, so the whole batch goes as one bulk send
+BULK_STATUS_UPDATE = SMSTemplate('bulk_status_update', [
+    "REQUEST UPDATE\n\n{status}\n\nFor assistance, call emergency services.",
+    "{status}\nFor help call emergency services.",
+], truncatable=('status',))
+
+WAITLIST_MATCH = SMSTemplate('waitlist_match', [
+    "EMERGENCY RESOURCE AVAILABLE\n\n"
+    "Service: {name}\nLocation: {location}\nContact: {contact}\nRequest ID: {request_id}\n\n"
+    "A place has been reserved for you. Please proceed to the location.",
+    "PLACE RESERVED: {name}\nLoc: {location}\nTel: {contact}\nRef: {request_id}\n"
+    "Please go to the location.",
+], truncatable=('name', 'location'))
@@ -0,0 +1,134 @@
+from app import db
+from app.models import User
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import bindparam
+from sqlalchemy.exc import IntegrityError
+import atexit
+import logging
+import threading
+import time
+
+class UserDirectory:
+    """Cached phone number to user ID lookups with write-behind last_active updates"""
+    
+    def __init__(self, max_entries=100000, flush_interval=30, max_pending=1000):
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._user_ids = OrderedDict()
+        self._pending_activity = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+    
+    def get_user_id(self, phone_number):
+        """Return the user ID for a phone number, creating the user on first dial"""
+        with self._lock:
+            user_id = self._user_ids.get(phone_number)
+            if user_id is not None:
+                self._user_ids.move_to_end(phone_number)
+                return user_id
+        
+        user_id = self._upsert_user(phone_number)
+        
+        with self._lock:
+            self._user_ids[phone_number] = user_id
+            if len(self._user_ids) > self.max_entries:
+                self._user_ids.popitem(last=False)
+        return user_id
+    
+    def touch(self, user_id):
+        """Record activity now; the UPDATE is deferred to the next batch flush"""
+        with self._lock:
+            self._pending_activity[user_id] = datetime.utcnow()
+    
+    def flush_due(self):
+        return bool(self._pending_activity) and (
+            len(self._pending_activity) >= self.max_pending
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
+    
+    def flush_last_active(self):
+        """Write coalesced last_active timestamps in one batched UPDATE (caller commits)"""
+        with self._lock:
+            pending, self._pending_activity = self._pending_activity, {}
+            self._last_flush = time.monotonic()
+        
+        if not pending:
+            return 0
+        
+        table = User.__table__
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('b_id')).values(last_active=bindparam('b_last_active')),
+            [{'b_id': user_id, 'b_last_active': last_active} for user_id, last_active in pending.items()]
+        )
+        return len(pending)
+    
+    def start_background_flush(self, app):
+        """Flush pending activity every flush_interval and at process exit, not only on the next hop"""
+        threading.Thread(target=self._flush_periodically, args=(app,), daemon=True).start()
+        # Runs when a worker exits or is recycled (gunicorn max_requests)
+        atexit.register(self.stop, app)
+    
+    def stop(self, app):
+        self._stopped.set()
+        self.flush_in_context(app)
+    
+    def flush_in_context(self, app):
+        """Flush and commit pending activity from outside a request; return rows written"""
+        if not self._pending_activity:
+            return 0
+        
+        with app.app_context():
+            try:
+                flushed = self.flush_last_active()
+                db.session.commit()
+                return flushed
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"last_active flush failed: {str(e)}")
+                return 0
+    
+    def _flush_periodically(self, app):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush_in_context(app)
+    
+    def forget(self, phone_number):
+        with self._lock:
+            self._user_ids.pop(phone_number, None)
+    
+    def _upsert_user(self, phone_number):
+        """Insert-or-fetch in one statement so concurrent first dials agree on one row"""
+        table = User.__table__
+        now = datetime.utcnow()
+        dialect = db.session.get_bind().dialect.name
+        
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            statement = insert(table).values(
+                phone_number=phone_number, created_at=now, last_active=now
+            )
+            statement = statement.on_conflict_do_update(
+                index_elements=['phone_number'],
+                set_={'phone_number': statement.excluded.phone_number}
+            ).returning(table.c.id)
+            return db.session.execute(statement).scalar_one()
+        
+        user_id = db.session.execute(
+            table.select().with_only_columns(table.c.id).where(table.c.phone_number == phone_number)
+        ).scalar()
+        if user_id is not None:
+            return user_id
+        try:
+            with db.session.begin_nested():
+                return db.session.execute(
+                    table.insert().values(phone_number=phone_number, created_at=now, last_active=now)
+                ).inserted_primary_key[0]
+        except IntegrityError:
+            return db.session.execute(
+                table.select().with_only_columns(table.c.id).where(table.c.phone_number == phone_number)
+            ).scalar_one()
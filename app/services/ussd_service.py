@@ -2,43 +2,68 @@ from app import db
 from app.models import User, USSDSession, EmergencyRequest, Resource, ResourceType
 from app.services.matching_service import MatchingService
 from app.services.sms_service import SMSService
+from app.services.waitlist_service import WaitlistService
+from app.services.user_directory import UserDirectory
 from datetime import datetime
 import uuid
 import json
 
+LOCATION_PROMPT = "Please enter your current location or nearest landmark:"
+
+# Cumulative-text gateways (e.g. Africa's Talking) send every input so far, as in 1*2*Lokoja
+PATH_SEPARATOR = '*'
+# Main-menu option that picks up an unfinished journey when the whole path is replayed each hop
+RESUME_OPTION = '4'
+
 class USSDService:
-    def __init__(self):
-        self.matching_service = MatchingService()
-        self.sms_service = SMSService()
+    def __init__(self, matching_service=None, sms_service=None, waitlist_service=None, user_directory=None,
+                 resume_minutes=5, cumulative_text=False):
+        self.matching_service = matching_service or MatchingService()
+        self.sms_service = sms_service or SMSService()
+        self.waitlist_service = waitlist_service or WaitlistService(self.sms_service)
+        self.user_directory = user_directory or UserDirectory()
+        self.resume_minutes = resume_minutes
+        self.cumulative_text = cumulative_text
     
     def process_ussd_request(self, phone_number, session_id, user_input):
         """Process incoming USSD request and return response"""
+        return self.process_hop(phone_number, session_id, user_input)[0]
+    
+    def process_hop(self, phone_number, session_id, user_input):
+        """Process a USSD request; return the response and the menu it left the session in (None once ended)"""
         
-        # Get or create user
-        user = self.get_or_create_user(phone_number)
-        
-        # Get or create session
-        session = self.get_or_create_session(session_id, user.id)
-        
-        # Process user input and generate response
-        response = self.handle_menu_navigation(session, user_input)
-        
-        # Update session
-        session.extend_session()
-        db.session.commit()
-        
-        return response
+        try:
+            # Get or create user
+            user_id = self.get_or_create_user_id(phone_number)
+            
+            if self.cumulative_text:
+                session, response = self.replay_path(session_id, user_id, user_input)
+            else:
+                # Get or create session
+                session = self.get_or_create_session(session_id, user_id)
+                
+                # Process user input and generate response
+                response = self.handle_menu_navigation(session, user_input)
+            menu = session.current_menu if response['continue_session'] else None
+            
+            # Update session
+            session.extend_session()
+            if self.user_directory.flush_due():
+                self.user_directory.flush_last_active()
+            db.session.commit()
+        except Exception:
+            # A rolled back first dial may have cached an ID that was never committed
+            db.session.rollback()
+            self.user_directory.forget(phone_number)
+            raise
+        
+        return response, menu
     
-    def get_or_create_user(self, phone_number):
-        """Get existing user or create new one"""
-        user = User.query.filter_by(phone_number=phone_number).first()
-        if not user:
-            user = User(phone_number=phone_number)
-            db.session.add(user)
-            db.session.flush()
-        else:
-            user.last_active = datetime.utcnow()
-        return user
+    def get_or_create_user_id(self, phone_number):
+        """Get existing user ID or create the user, recording activity write-behind"""
+        user_id = self.user_directory.get_user_id(phone_number)
+        self.user_directory.touch(user_id)
+        return user_id
     
     def get_or_create_session(self, session_id, user_id):
         """Get existing session or create new one"""
@@ -54,6 +79,70 @@ class USSDService:
             db.session.flush()
         return session
     
+    def replay_path(self, session_id, user_id, text):
+        """Rebuild a session from a cumulative path and answer its last input
+        
+        Menu hops are replayed in memory. The session row is only read to skip past steps
+        that matched or resumed, and only written when the last input matches, resumes or
+        confirms; it records how many steps it covers.
+        """
+        steps = text.split(PATH_SEPARATOR) if text else []
+        session = USSDSession(session_id=session_id, user_id=user_id, current_menu='main')
+        stored = None
+        
+        position = 0
+        while position < len(steps) - 1:
+            step = steps[position]
+            if not self.is_stateful_step(session.current_menu, step):
+                self.handle_menu_navigation(session, step)
+                position += 1
+                continue
+            
+            # Earlier hops answered this step and stored the state that followed it
+            if stored is None:
+                stored = USSDSession.query.filter_by(session_id=session_id).first()
+            covered = stored.get_session_data().get('path_steps', 0) if stored is not None and stored.is_active and not stored.is_expired() else 0
+            if not position < covered < len(steps):
+                return session, {
+                    'message': "Your session has expired. Please dial again.",
+                    'continue_session': False
+                }
+            self.copy_session_state(stored, session)
+            position = covered
+        
+        user_input = steps[-1] if steps else ''
+        if not self.is_stateful_step(session.current_menu, user_input):
+            return session, self.handle_menu_navigation(session, user_input)
+        
+        row = stored or USSDSession.query.filter_by(session_id=session_id).first()
+        if row is None:
+            # First stored step of this session; the replayed state becomes its row
+            row = session
+            db.session.add(row)
+            db.session.flush()
+        else:
+            self.copy_session_state(session, row)
+        
+        response = self.handle_menu_navigation(row, user_input)
+        row.update_session_data('path_steps', len(steps))
+        return row, response
+    
+    @staticmethod
+    def is_stateful_step(menu, user_input):
+        """Whether answering this input reads or writes state beyond the session's own menus"""
+        if menu == 'main':
+            return user_input == RESUME_OPTION
+        if menu == 'location':
+            return user_input.strip() != ''
+        return menu == 'confirm' and user_input != '0'
+    
+    @staticmethod
+    def copy_session_state(source, target):
+        target.current_menu = source.current_menu
+        target.menu_history = source.menu_history
+        target.user_input_history = source.user_input_history
+        target.session_data = source.session_data
+    
     def handle_menu_navigation(self, session, user_input):
         """Handle menu navigation based on current menu and user input"""
         
@@ -71,12 +160,23 @@ class USSDService:
             return self.handle_location_input(session, user_input)
         elif current_menu == 'confirm':
             return self.handle_confirmation(session, user_input)
+        elif current_menu == 'resume':
+            return self.handle_resume(session, user_input)
         else:
             return self.show_main_menu(session)
     
     def handle_main_menu(self, session, user_input):
         """Handle main menu selection"""
         if user_input == '':
+            # A redial after a dropped session may pick up where the caller left off
+            if not session.get_menu_history():
+                if self.cumulative_text:
+                    # The next input can't depend on an offer screen, so the offer is a main-menu option
+                    previous = self.find_resumable(session)
+                    return self.show_main_menu(session, resume=self.describe_unfinished(previous) if previous else None)
+                offer = self.offer_resume(session)
+                if offer:
+                    return offer
             return self.show_main_menu(session)
         
         if user_input == '1':
@@ -94,9 +194,99 @@ class USSDService:
             session.add_to_menu_history('main')
             session.add_to_input_history(user_input)
             return self.show_transport_menu(session)
+        elif user_input == RESUME_OPTION and self.cumulative_text:
+            previous = self.find_resumable(session)
+            if previous is not None:
+                return self.adopt_session(session, previous)
+            return self.show_main_menu(session, error="Invalid option. Please try again.")
         else:
             return self.show_main_menu(session, error="Invalid option. Please try again.")
     
+    def find_resumable(self, session):
+        """The caller's unfinished journey from a dropped session, if resume is enabled"""
+        if not self.resume_minutes:
+            return None
+        return USSDSession.find_unfinished(session.user_id, self.resume_minutes, exclude_id=session.id)
+    
+    @staticmethod
+    def describe_unfinished(previous):
+        data = previous.get_session_data()
+        resource_type = data.get('resource_type') or (previous.current_menu if previous.current_menu in ('shelter', 'food', 'transport') else None)
+        need = f"{resource_type} request" if resource_type else "request"
+        place = f" near {data['location']}" if data.get('location') else ""
+        return f"{need}{place}"
+    
+    def offer_resume(self, session):
+        """Offer to continue the caller's unfinished journey from a dropped session, if any"""
+        previous = self.find_resumable(session)
+        if previous is None:
+            return None
+        
+        session.current_menu = 'resume'
+        session.update_session_data('resume_from', previous.id)
+        return {
+            'message': f"You have an unfinished {self.describe_unfinished(previous)}.\n\n1. Continue where you left off\n2. Start over",
+            'continue_session': True
+        }
+    
+    def handle_resume(self, session, user_input):
+        """Adopt the dropped session's state, or discard it and start at the main menu"""
+        if user_input not in ('1', '2'):
+            return {
+                'message': "Invalid option.\n\n1. Continue where you left off\n2. Start over",
+                'continue_session': True
+            }
+        
+        previous = USSDSession.query.get(session.get_session_data().get('resume_from'))
+        resumable = previous is not None and previous.is_active and previous.user_id == session.user_id
+        
+        if user_input == '1' and resumable:
+            return self.adopt_session(session, previous)
+        
+        if resumable:
+            previous.end_session()
+        session.current_menu = 'main'
+        session.set_session_data({})
+        return self.show_main_menu(session)
+    
+    def adopt_session(self, session, previous):
+        """Continue a dropped session's journey in this one, ending the dropped session"""
+        previous.end_session()
+        self.copy_session_state(previous, session)
+        return self.show_current_menu(session)
+    
+    def show_current_menu(self, session):
+        """Re-render the screen for the menu a session is in"""
+        current_menu = session.current_menu
+        
+        if current_menu == 'shelter':
+            return self.show_shelter_menu(session)
+        elif current_menu == 'food':
+            return self.show_food_menu(session)
+        elif current_menu == 'transport':
+            return self.show_transport_menu(session)
+        elif current_menu == 'location':
+            return {
+                'message': LOCATION_PROMPT,
+                'continue_session': True
+            }
+        elif current_menu == 'confirm':
+            match_ids = session.get_match_ids()
+            resources = {
+                resource.id: resource
+                for resource in Resource.query.filter(Resource.id.in_(match_ids)).all()
+            }
+            matches = [resources[resource_id] for resource_id in match_ids if resource_id in resources]
+            if matches:
+                return self.show_matches(session, matches)
+            
+            # Matches vanished meanwhile; ask for the location again to re-match
+            session.current_menu = 'location'
+            return self.show_current_menu(session)
+        
+        session.current_menu = 'main'
+        return self.show_main_menu(session)
+    
     def handle_shelter_menu(self, session, user_input):
         """Handle shelter submenu"""
         if user_input == '1':
@@ -143,7 +333,7 @@ class USSDService:
         session.update_session_data('subtype', subtype)
         
         return {
-            'message': "Please enter your current location or nearest landmark:",
+            'message': LOCATION_PROMPT,
             'continue_session': True
         }
     
@@ -159,7 +349,7 @@ class USSDService:
         
         # Find matching resources
         resource_type = ResourceType(session.get_session_data().get('resource_type'))
-        matches = self.matching_service.find_nearby_resources(
+        matches = self.matching_service.find_matches(
             resource_type=resource_type,
             location=user_input,
             limit=3
@@ -167,11 +357,19 @@ class USSDService:
         
         if matches:
             session.current_menu = 'confirm'
-            session.update_session_data('matches', [r.to_dict() for r in matches])
+            session.set_matches(matches)
             return self.show_matches(session, matches)
         else:
+            session_data = session.get_session_data()
+            request = self.waitlist_service.add_to_waitlist(
+                session.user,
+                resource_type,
+                user_input,
+                subtype=session_data.get('subtype')
+            )
+            session.end_session()
             return {
-                'message': f"Sorry, no {resource_type.value} resources are currently available in your area. We have recorded your request and will notify you when resources become available.",
+                'message': f"Sorry, no {resource_type.value} resources are currently available in your area. We have recorded your request (ID: {request.id}) and will notify you by SMS when resources become available.",
                 'continue_session': False
             }
     
@@ -201,11 +399,10 @@ class USSDService:
         
         try:
             selection = int(user_input) - 1
-            matches = session.get_session_data().get('matches', [])
+            match_ids = session.get_match_ids()
             
-            if 0 <= selection < len(matches):
-                selected_resource = matches[selection]
-                return self.create_emergency_request(session, selected_resource)
+            if 0 <= selection < len(match_ids):
+                return self.create_emergency_request(session, match_ids[selection])
             else:
                 return {
                     'message': "Invalid selection. Please choose 1-3 or 0 to go back:",
@@ -217,10 +414,10 @@ class USSDService:
                 'continue_session': True
             }
     
-    def create_emergency_request(self, session, selected_resource):
+    def create_emergency_request(self, session, resource_id):
         """Create emergency request and send notifications"""
         user = session.user
-        resource = Resource.query.get(selected_resource['id'])
+        resource = Resource.query.get(resource_id)
         
         if not resource or not resource.has_capacity():
             return {
@@ -232,7 +429,7 @@ class USSDService:
         request = EmergencyRequest(
             user_id=user.id,
             resource_id=resource.id,
-            resource_type=ResourceType(selected_resource['resource_type']),
+            resource_type=resource.resource_type,
             location=session.get_session_data().get('location'),
             notes=session.get_session_data().get('subtype')
         )
@@ -261,8 +458,8 @@ class USSDService:
             'continue_session': False
         }
     
-    def show_main_menu(self, session, error=None):
-        """Show main menu"""
+    def show_main_menu(self, session, error=None, resume=None):
+        """Show main menu, with an option to continue the described unfinished request if given"""
         message = "🚨 EMERGENCY RESPONSE SYSTEM 🚨\n\n"
         if error:
             message += f"❌ {error}\n\n"
@@ -271,6 +468,8 @@ class USSDService:
         message += "1. Shelter\n"
         message += "2. Food\n"
         message += "3. Transport\n"
+        if resume:
+            message += f"{RESUME_OPTION}. Continue unfinished {resume}\n"
         
         return {
             'message': message,
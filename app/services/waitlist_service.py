@@ -0,0 +1,66 @@
+from app import db
+from app.models import Resource, ResourceFeatures, EmergencyRequest, WaitlistEntry
+from app.models.request import RequestStatus
+from app.regions import region_with_neighbours
+from app.services.sms_service import SMSService
+
+class WaitlistService:
+    def __init__(self, sms_service=None):
+        self.sms_service = sms_service or SMSService()
+    
+    def add_to_waitlist(self, user, resource_type, location, subtype=None):
+        """Record an unmatched request as PENDING so it can be woken later"""
+        request = EmergencyRequest(
+            user_id=user.id,
+            resource_type=resource_type,
+            status=RequestStatus.PENDING,
+            location=location,
+            notes=subtype
+        )
+        db.session.add(request)
+        db.session.add(WaitlistEntry.for_request(request))
+        db.session.flush()
+        return request
+    
+    def wake_for_resource(self, resource_id):
+        """Match waitlisted requests that this resource can now serve"""
+        resource = Resource.query.get(resource_id)
+        if not resource or not resource.has_capacity():
+            return 0
+        
+        features = resource.features or ResourceFeatures.for_resource(resource)
+        # Only requests still waiting; one cancelled or completed meanwhile must not be matched
+        query = WaitlistEntry.query.join(
+            EmergencyRequest, EmergencyRequest.id == WaitlistEntry.request_id
+        ).filter(
+            db.or_(EmergencyRequest.status == RequestStatus.PENDING, EmergencyRequest.status.is_(None)),
+            WaitlistEntry.resource_type == resource.resource_type,
+            WaitlistEntry.area_key.in_(WaitlistEntry.area_keys_for(features.location_key))
+        )
+        if features.region_key:
+            query = query.filter(db.or_(
+                WaitlistEntry.region_key.in_(region_with_neighbours(features.region_key)),
+                WaitlistEntry.region_key.is_(None)
+            ))
+        entries = query.order_by(WaitlistEntry.created_at).limit(resource.available_capacity).all()
+        
+        woken = []
+        for entry in entries:
+            request = entry.request
+            if not resource.reserve_capacity(request.people_count or 1):
+                break
+            request.resource_id = resource.id
+            request.update_status(RequestStatus.MATCHED)
+            db.session.delete(entry)
+            woken.append(request)
+        
+        if not woken:
+            return 0
+        
+        db.session.commit()
+        
+        for request in woken:
+            self.sms_service.send_waitlist_match(request.user, resource, request)
+            self.sms_service.send_provider_alert(resource, request)
+        
+        return len(woken)
\ No newline at end of file
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+SMS Pipeline Throughput Benchmark
+
+Drives send_bulk_alert, send_resource_alert and the USSD confirm hop against
+the local gateway simulator and reports messages per second and tail latency.
+Use it to tune SMS_GATEWAY_BATCH_SIZE, SMS_GATEWAY_TIMEOUT and sender
+concurrency offline before trusting them in a disaster.
+
+Usage: python bench_sms.py [--messages 500] [--concurrency 4] [--latency-ms 50] [--error-rate 0.02]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+from sms_gateway_simulator import GatewaySimulator
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def make_timed_service(latencies, lock, delivered=None):
+    """Build an SMSService whose gateway calls record their wall-clock latency"""
+    from app.services.sms_service import SMSService
+    
+    class TimedSMSService(SMSService):
+        def _post(self, payload):
+            started = time.perf_counter()
+            ok = False
+            try:
+                status_code = super()._post(payload)
+                ok = status_code == 200
+                return status_code
+            finally:
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                    if ok and delivered is not None:
+                        delivered.append(payload['to'])
+    
+    return TimedSMSService()
+
+def report(name, sent, attempted, elapsed, latencies):
+    print(f"\n📨 {name}")
+    print(f"   - Delivered: {sent}/{attempted} messages in {elapsed:.2f} s")
+    print(f"   - Throughput: {sent / elapsed if elapsed else 0:.1f} msgs/sec")
+    print(f"   - Gateway calls: {len(latencies)}")
+    print(f"   - Latency p50/p95/p99: {percentile(latencies, 0.50) * 1000:.1f} / "
+          f"{percentile(latencies, 0.95) * 1000:.1f} / {percentile(latencies, 0.99) * 1000:.1f} ms")
+
+def bench_bulk_alert(app, args):
+    """Split a recipient list across sender threads, each calling send_bulk_alert"""
+    latencies, lock = [], threading.Lock()
+    with app.app_context():
+        service = make_timed_service(latencies, lock)
+    
+    phone_numbers = [f"+23480{index:08d}" for index in range(args.messages)]
+    chunks = [phone_numbers[index::args.concurrency] for index in range(args.concurrency)]
+    
+    def send(chunk):
+        with app.app_context():
+            return service.send_bulk_alert(chunk, 'FLOOD ALERT: Move to higher ground. Shelters open in Lokoja.')
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        sent = sum(executor.map(send, chunks))
+    report('send_bulk_alert', sent, len(phone_numbers), time.perf_counter() - started, latencies)
+
+def bench_resource_alert(app, args):
+    """Alert every provider of a type around a location"""
+    from app.models import ResourceType
+    
+    latencies, lock = [], threading.Lock()
+    with app.app_context():
+        service = make_timed_service(latencies, lock)
+        started = time.perf_counter()
+        sent = service.send_resource_alert(ResourceType.FOOD, 'Lokoja', 'Food stocks needed at Lokoja camps.')
+        elapsed = time.perf_counter() - started
+    report('send_resource_alert', sent, args.providers, elapsed, latencies)
+
+def bench_confirm(app, args):
+    """Run full USSD journeys concurrently and time the confirm hop, which sends two SMS"""
+    latencies, lock = [], threading.Lock()
+    confirm_latencies, delivered = [], []
+    with app.app_context():
+        app.extensions['services'].register('sms', lambda registry: make_timed_service(latencies, lock, delivered))
+    
+    def journey(index):
+        client = app.test_client()
+        phone_number, session_id = f"+23490{index:08d}", f"bench_sms_{index}"
+        for user_input in ['', '1', '1', 'Lokoja']:
+            client.post('/ussd/test', json={'phone_number': phone_number, 'session_id': session_id, 'input': user_input})
+        
+        started = time.perf_counter()
+        response = client.post('/ussd/test', json={'phone_number': phone_number, 'session_id': session_id, 'input': '1'})
+        elapsed = time.perf_counter() - started
+        with lock:
+            confirm_latencies.append(elapsed)
+        return response.status_code == 200 and 'confirmed' in response.get_json()['response']['message'].lower()
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        confirmed = sum(executor.map(journey, range(args.journeys)))
+    elapsed = time.perf_counter() - started
+    
+    report('USSD confirm hop', len(delivered), args.journeys * 2, elapsed, latencies)
+    print(f"   - Confirmed journeys: {confirmed}/{args.journeys}")
+    print(f"   - Confirm hop p50/p95/p99: {percentile(confirm_latencies, 0.50) * 1000:.1f} / "
+          f"{percentile(confirm_latencies, 0.95) * 1000:.1f} / {percentile(confirm_latencies, 0.99) * 1000:.1f} ms")
+
+def seed(app, args):
+    """Create the schema plus a shelter for USSD journeys and food providers to alert"""
+    from app import db
+    from app.models import Resource, ResourceType
+    
+    with app.app_context():
+        db.create_all()
+        
+        shelter = Resource(
+            name='Benchmark Shelter', resource_type=ResourceType.SHELTER, location='Lokoja',
+            latitude=7.8023, longitude=6.7343, total_capacity=args.journeys * 2,
+            available_capacity=args.journeys * 2, contact_phone='+2348099999999'
+        )
+        db.session.add(shelter)
+        for index in range(args.providers):
+            db.session.add(Resource(
+                name=f'Food Point {index}', resource_type=ResourceType.FOOD, location='Lokoja',
+                latitude=7.8023, longitude=6.7343, total_capacity=100, available_capacity=100,
+                contact_phone=f"+23470{index:08d}"
+            ))
+        db.session.flush()
+        for resource in Resource.query.all():
+            resource.refresh_features()
+        db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure SMS pipeline throughput against a local gateway')
+    parser.add_argument('--messages', type=int, default=500, help='recipients for send_bulk_alert')
+    parser.add_argument('--providers', type=int, default=100, help='providers for send_resource_alert')
+    parser.add_argument('--journeys', type=int, default=50, help='USSD journeys to confirm')
+    parser.add_argument('--concurrency', type=int, default=4, help='sender threads')
+    parser.add_argument('--batch-size', type=int, default=1, help='SMS_GATEWAY_BATCH_SIZE')
+    parser.add_argument('--timeout', type=float, default=10, help='SMS_GATEWAY_TIMEOUT in seconds')
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--jitter-ms', type=float, default=10)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=int, default=0, help='gateway messages per second, 0 for unlimited')
+    parser.add_argument('--max-batch', type=int, default=100, help='largest batch the gateway accepts')
+    args = parser.parse_args()
+    
+    # Injected gateway failures are expected; keep the report readable
+    logging.disable(logging.CRITICAL)
+    
+    print("📡 SMS PIPELINE BENCHMARK")
+    print("=========================")
+    
+    simulator = GatewaySimulator(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        rate_limit=args.rate_limit, max_batch=args.max_batch, seed=1
+    ).start()
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        from app import create_app
+        
+        app = create_app('production')
+        app.config.update(
+            SMS_GATEWAY_URL=simulator.url,
+            SMS_API_KEY='bench',
+            SMS_GATEWAY_BATCH_SIZE=args.batch_size,
+            SMS_GATEWAY_TIMEOUT=args.timeout
+        )
+        seed(app, args)
+        
+        print(f"Gateway: {simulator.url} ({args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, "
+              f"{args.error_rate:.0%} errors, rate limit {args.rate_limit or 'none'})")
+        print(f"Senders: {args.concurrency} threads, batch size {args.batch_size}, timeout {args.timeout:.1f} s")
+        
+        bench_bulk_alert(app, args)
+        bench_resource_alert(app, args)
+        bench_confirm(app, args)
+    
+    simulator.stop()
+    print(f"\nGateway stats: {simulator.stats}")
+
+if __name__ == "__main__":
+    main()
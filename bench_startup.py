@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Cold Start Benchmark
+
+Measures how long a fresh worker process takes from launch to serving its
+first /ussd/callback, and fails if the median exceeds the startup budget.
+Autoscaled workers must come online quickly during a surge.
+
+Most of a cold start is importing Flask and SQLAlchemy, which varies with the
+machine. The time this codebase adds on top (importing the app package,
+create_app() and the first hop) has its own, tighter budget, so an extra
+import fails here long before the total budget is blown.
+
+Usage: python bench_startup.py [--runs 5] [--budget 1.0] [--app-budget 0.25]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def child_main(prepare):
+    """Run inside the measured process: build the app and serve one hop"""
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    import flask, flask_sqlalchemy, sqlalchemy.orm  # noqa: F401
+    libraries = time.perf_counter()
+    from app import create_app, db
+    imported = time.perf_counter()
+    
+    app = create_app('production')
+    created = time.perf_counter()
+    
+    if prepare:
+        with app.app_context():
+            db.create_all()
+        return
+    
+    response = app.test_client().post('/ussd/callback', json={
+        'phoneNumber': '+2348000000001',
+        'sessionId': f'bench_{os.getpid()}',
+        'text': ''
+    })
+    if response.status_code != 200 or not response.get_json().get('continueSession'):
+        print(f"FAILED {response.status_code} {response.get_data(as_text=True)}", flush=True)
+        sys.exit(1)
+    served = time.perf_counter()
+    
+    print(f"SERVED {libraries - started:.6f} {imported - libraries:.6f} {created - imported:.6f} "
+          f"{served - created:.6f}", flush=True)
+
+def run_child(database_url, prepare=False):
+    """Launch a worker process; return total seconds and the in-process phase timings"""
+    env = dict(os.environ, DATABASE_URL=database_url)
+    args = [sys.executable, os.path.abspath(__file__), '--child']
+    if prepare:
+        args.append('--prepare')
+    
+    started = time.perf_counter()
+    result = subprocess.run(args, env=env, capture_output=True, text=True, cwd=ROOT)
+    elapsed = time.perf_counter() - started
+    
+    if result.returncode != 0 or (not prepare and 'SERVED' not in result.stdout):
+        print(f"❌ Worker failed:\n{result.stdout}{result.stderr}")
+        sys.exit(1)
+    
+    if prepare:
+        return elapsed, None
+    phases = [float(value) for value in result.stdout.split('SERVED', 1)[1].split()]
+    return elapsed, phases
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure worker cold start time')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=1.0, help='median seconds allowed')
+    parser.add_argument('--app-budget', type=float, default=0.25,
+                        help='median seconds allowed on top of importing Flask and SQLAlchemy')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--prepare', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        child_main(args.prepare)
+        return
+    
+    print("⏱️ COLD START BENCHMARK")
+    print("=======================")
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        run_child(database_url, prepare=True)
+        
+        results = [run_child(database_url) for _ in range(args.runs)]
+    
+    timings = [elapsed for elapsed, phases in results]
+    median = statistics.median(timings)
+    print(f"Runs: {args.runs}")
+    print(f"Min: {min(timings) * 1000:.0f} ms")
+    print(f"Median: {median * 1000:.0f} ms")
+    print(f"Max: {max(timings) * 1000:.0f} ms")
+    
+    print("\nMedian phase breakdown:")
+    for index, name in enumerate(['Import Flask and SQLAlchemy', 'Import app package', 'create_app()',
+                                  'First /ussd/callback']):
+        phase = statistics.median(phases[index] for elapsed, phases in results)
+        print(f"   - {name}: {phase * 1000:.0f} ms")
+    app_median = statistics.median(sum(phases[1:]) for elapsed, phases in results)
+    print(f"Median app-owned time: {app_median * 1000:.0f} ms")
+    print()
+    
+    failed = False
+    if median > args.budget:
+        print(f"❌ Median start-to-first-hop exceeds budget of {args.budget * 1000:.0f} ms")
+        failed = True
+    if app_median > args.app_budget:
+        print(f"❌ Median app-owned time exceeds budget of {args.app_budget * 1000:.0f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    
+    print(f"✅ Within budgets of {args.budget * 1000:.0f} ms total and {args.app_budget * 1000:.0f} ms app-owned")
+
+if __name__ == "__main__":
+    main()
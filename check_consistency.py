@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Write-Path Consistency Check
+
+Exercises the write paths that defer or batch their work and fails if any of
+them leaves the database out of step: buffered writes that never land, or
+capacity bookkeeping that the reconciler would later report as drift.
+
+Usage: python check_consistency.py
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+STALE = datetime(2000, 1, 1)
+
+# Apps built in this process, stopped before their database is removed
+apps = []
+
+def make_app(**config):
+    """An app on DATABASE_URL with SMS disabled"""
+    from app import create_app, db
+    
+    app = create_app('production')
+    app.config.update(SMS_GATEWAY_URL=None, SMS_API_KEY=None, **config)
+    with app.app_context():
+        db.create_all()
+    apps.append(app)
+    return app
+
+def dial(app, phone_number, session_id):
+    response = app.test_client().post('/ussd/callback', json={
+        'phoneNumber': phone_number, 'sessionId': session_id, 'text': ''
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+def last_active(app, phone_number):
+    from app import db
+    from app.models import User
+    
+    with app.app_context():
+        db.session.remove()
+        return User.query.filter_by(phone_number=phone_number).one().last_active
+
+def make_stale(app, phone_number):
+    """Create the user and backdate last_active, so a later flush is visible"""
+    from app import db
+    from app.models import User
+    
+    dial(app, phone_number, f'{phone_number}_setup')
+    with app.app_context():
+        User.query.filter_by(phone_number=phone_number).update({'last_active': STALE})
+        db.session.commit()
+
+def make_resource(app, name, total_capacity, available_capacity):
+    from app import db
+    from app.models import Resource, ResourceType
+    
+    with app.app_context():
+        resource = Resource(
+            name=name, resource_type=ResourceType.SHELTER, location='Lokoja', latitude=7.8023, longitude=6.7333,
+            total_capacity=total_capacity, available_capacity=available_capacity
+        )
+        db.session.add(resource)
+        db.session.commit()
+        return resource.id
+
+def make_user(app, phone_number):
+    from app import db
+    from app.models import User
+    
+    with app.app_context():
+        user = User(phone_number=phone_number)
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+def drift(app, resource_id):
+    """What the reconciler reports for one resource, or None if it has not drifted"""
+    from app import db
+    
+    with app.app_context():
+        db.session.remove()
+        report = app.extensions['services'].get('reconciler').reconcile()
+        return next((row for row in report['resources'] if row['resource_id'] == resource_id), None)
+
+def check_last_active_flushed_without_traffic(database_url):
+    """A buffered last_active write lands on its timer, with no further hop"""
+    app = make_app(LAST_ACTIVE_FLUSH_SECONDS=0.5)
+    phone_number = '+2348200000001'
+    make_stale(app, phone_number)
+    
+    dial(app, phone_number, 'consistency_timer')
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        if last_active(app, phone_number) > STALE:
+            return None
+        time.sleep(0.1)
+    return 'last_active still stale 5 s after the hop'
+
+def check_last_active_flushed_at_exit(database_url):
+    """A worker that exits with buffered last_active writes flushes them first"""
+    app = make_app()
+    phone_number = '+2348200000002'
+    make_stale(app, phone_number)
+    
+    # A fresh worker with a flush interval it never reaches: only the exit flush can write
+    child = (
+        f"import sys; sys.path.insert(0, {ROOT!r})\n"
+        "from check_consistency import make_app, dial\n"
+        "app = make_app(LAST_ACTIVE_FLUSH_SECONDS=3600)\n"
+        f"dial(app, {phone_number!r}, 'consistency_exit')\n"
+    )
+    result = subprocess.run([sys.executable, '-c', child], env=dict(os.environ, DATABASE_URL=database_url),
+                            capture_output=True, text=True, cwd=ROOT)
+    if result.returncode != 0:
+        return f'worker failed:\n{result.stdout}{result.stderr}'
+    if last_active(app, phone_number) <= STALE:
+        return 'last_active still stale after the worker exited'
+    return None
+
+def check_bulk_completion_releases_capacity(database_url):
+    """Completing matched requests in bulk gives their seats back"""
+    from app import db
+    from app.models import EmergencyRequest, ResourceType
+    from app.models.request import RequestStatus
+    
+    app = make_app()
+    resource_id = make_resource(app, 'Consistency Bulk Shelter', 10, 5)
+    user_id = make_user(app, '+2348200000003')
+    with app.app_context():
+        requests = [
+            EmergencyRequest(user_id=user_id, resource_id=resource_id, resource_type=ResourceType.SHELTER,
+                             status=RequestStatus.MATCHED, location='Lokoja', people_count=people_count)
+            for people_count in (3, 2)
+        ]
+        db.session.add_all(requests)
+        db.session.commit()
+        ids = [request.id for request in requests]
+    
+    response = app.test_client().put('/api/requests/status', json={
+        'ids': ids[:1], 'status': 'completed', 'notify': False
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+    response = app.test_client().put('/api/requests/status', json={
+        'ids': ids[1:], 'status': 'cancelled', 'notify': False
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+    
+    row = drift(app, resource_id)
+    if row:
+        return f"reconciler reports drift {row['drift']} after the bulk update"
+    return None
+
+def check_waitlist_wake_reserves_every_seat(database_url):
+    """Waking multi-person waitlisted requests reserves seats the reconciler agrees with"""
+    from app import db
+    from app.models import EmergencyRequest, ResourceType, User
+    from app.models.request import RequestStatus
+    
+    app = make_app()
+    user_id = make_user(app, '+2348200000004')
+    with app.app_context():
+        waitlist = app.extensions['services'].get('waitlist')
+        user = db.session.get(User, user_id)
+        for people_count in (3, 4):
+            request = waitlist.add_to_waitlist(user, ResourceType.SHELTER, 'Lokoja')
+            request.people_count = people_count
+        db.session.commit()
+    
+    resource_id = make_resource(app, 'Consistency Waitlist Shelter', 10, 10)
+    with app.app_context():
+        app.extensions['services'].get('waitlist').wake_for_resource(resource_id)
+        matched = EmergencyRequest.query.filter_by(resource_id=resource_id, status=RequestStatus.MATCHED).count()
+    if matched != 2:
+        return f'expected 2 woken requests, found {matched}'
+    
+    row = drift(app, resource_id)
+    if row:
+        return f"reconciler reports drift {row['drift']} after the wake"
+    return None
+
+def check_wake_skips_closed_requests(database_url):
+    """Waitlisted requests cancelled or completed before a wake stay closed"""
+    from app import db
+    from app.models import EmergencyRequest, Resource, ResourceType, User
+    
+    app = make_app()
+    user_id = make_user(app, '+2348200000005')
+    with app.app_context():
+        waitlist = app.extensions['services'].get('waitlist')
+        user = db.session.get(User, user_id)
+        ids = [waitlist.add_to_waitlist(user, ResourceType.SHELTER, 'Lokoja').id for _ in range(2)]
+        db.session.commit()
+    
+    client = app.test_client()
+    response = client.put(f'/api/requests/{ids[0]}/status', json={'status': 'cancelled'})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    response = client.put('/api/requests/status', json={'ids': ids[1:], 'status': 'completed', 'notify': False})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    
+    resource_id = make_resource(app, 'Consistency Closed Shelter', 10, 10)
+    with app.app_context():
+        app.extensions['services'].get('waitlist').wake_for_resource(resource_id)
+        statuses = sorted(request.status.value for request in EmergencyRequest.query.filter(EmergencyRequest.id.in_(ids)))
+        available = db.session.get(Resource, resource_id).available_capacity
+    if statuses != ['cancelled', 'completed'] or available != 10:
+        return f'closed requests woken: statuses {statuses}, {available}/10 seats left'
+    return None
+
+CHECKS = [
+    check_last_active_flushed_without_traffic,
+    check_last_active_flushed_at_exit,
+    check_bulk_completion_releases_capacity,
+    check_waitlist_wake_reserves_every_seat,
+    check_wake_skips_closed_requests,
+]
+
+def main():
+    print("🔁 WRITE-PATH CONSISTENCY CHECK")
+    print("===============================")
+    
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = f"sqlite:///{os.path.join(workdir, 'consistency.db')}"
+        os.environ['DATABASE_URL'] = database_url
+        
+        for check in CHECKS:
+            problem = check(database_url)
+            print(f"   {'❌' if problem else '✅'} {check.__doc__}")
+            if problem:
+                print(f"        {problem}")
+                failures.append(check.__name__)
+        
+        for app in apps:
+            with app.app_context():
+                app.extensions['services'].get('users').stop(app)
+    
+    print()
+    if failures:
+        print(f"❌ {len(failures)} check(s) failed: {', '.join(failures)}")
+        sys.exit(1)
+    
+    print("✅ All write paths consistent")
+
+if __name__ == "__main__":
+    main()
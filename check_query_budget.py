@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Per-Hop SQL Query Budget Check
+
+Counts and times the SQL statements each USSD menu hop and each main API
+endpoint issues, using SQLAlchemy engine events, and fails if any exceeds
+its budget. Query count is the best predictor of tail latency on SQLite, so
+a refactor that adds round trips should fail here, not in production.
+
+Usage: python check_query_budget.py [--verbose]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+# Statement budgets per USSD hop, measured in steady state (process caches warm).
+# Raise a budget only alongside the change that needs the extra round trip.
+USSD_BUDGETS = {
+    'first dial (new user)': 5,
+    'first dial (returning user)': 4,
+    'select type': 2,
+    'select subtype': 2,
+    'enter location (match cache miss)': 4,
+    'enter location (match cache hit)': 4,
+    'confirm selection': 12,
+}
+
+# The same journey from a gateway that sends the whole path (USSD_CUMULATIVE_TEXT);
+# menu hops are replayed without touching the session table
+CUMULATIVE_BUDGETS = {
+    'first dial (new user)': 2,
+    'select type': 0,
+    'select subtype': 0,
+    # The new session row is flushed on insert, so a no-match hop can waitlist through session.user
+    'enter location (match cache hit)': 5,
+    'enter location (no match, match cache hit)': 9,
+    'confirm selection': 14,
+}
+
+# Statement budgets per API request
+API_BUDGETS = {
+    ('GET', '/api/resources'): 1,
+    ('GET', '/api/resources?q=shelter'): 1,
+    ('GET', '/api/resources?location=Lokoja'): 1,
+    ('GET', '/api/requests'): 1,
+    ('GET', '/api/stats'): 2,
+    ('GET', '/api/stats/timeseries'): 1,
+    ('GET', '/api/stats/latency'): 1,
+    ('GET', '/api/metrics'): 1,
+    ('POST', '/api/search'): 1,
+    ('GET', '/ussd/health'): 0,
+    ('GET', '/admin/'): 3,
+    ('GET', '/admin/api/resources'): 1,
+    ('GET', '/admin/api/requests'): 1,
+}
+
+class StatementRecorder:
+    """Collects (statement, parameters, seconds) for every cursor execute on an engine"""
+    
+    def __init__(self, engine):
+        from sqlalchemy import event
+        
+        self.statements = []
+        self._started = None
+        event.listen(engine, 'before_cursor_execute', self._before)
+        event.listen(engine, 'after_cursor_execute', self._after)
+    
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        self._started = time.perf_counter()
+    
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters, time.perf_counter() - self._started))
+    
+    def measure(self, call):
+        """Run call() and return the statements it issued"""
+        self.statements = []
+        call()
+        return list(self.statements)
+
+def seed(app):
+    """Create the schema and a few resources to match against"""
+    from app import db
+    from app.models import Resource, ResourceType
+    
+    with app.app_context():
+        db.create_all()
+        for index, (resource_type, location) in enumerate([
+            (ResourceType.SHELTER, 'Lokoja, Kogi State'),
+            (ResourceType.SHELTER, 'Ganaja, Lokoja'),
+            (ResourceType.FOOD, 'Lokoja, Kogi State'),
+            (ResourceType.TRANSPORT, 'Adankolo, Lokoja'),
+        ]):
+            resource = Resource(
+                name=f'Budget Resource {index}', description='Emergency shelter and supplies',
+                resource_type=resource_type, location=location, latitude=7.8023, longitude=6.7343,
+                total_capacity=1000, available_capacity=1000, contact_phone=f'+23480000000{index:02d}',
+                organization='Red Cross'
+            )
+            resource.refresh_features()
+            db.session.add(resource)
+        db.session.commit()
+
+def ussd_hops(app, phone_number, session_id, cumulative=False, location='Lokoja'):
+    """(hop name, callable) pairs for one full shelter journey"""
+    client = app.test_client()
+    
+    path = []
+    
+    def hop(text):
+        if cumulative:
+            path.append(text)
+            text = '*'.join(path[1:])
+        
+        def call():
+            response = client.post('/ussd/callback', json={
+                'phoneNumber': phone_number, 'sessionId': session_id, 'text': text
+            })
+            assert response.status_code == 200, response.get_data(as_text=True)
+            # The callback answers errors with a 200 too; a hop that failed measured nothing real
+            assert 'temporarily unavailable' not in response.get_json()['message'], f'{text!r} failed'
+        return call
+    
+    def clear_match_cache():
+        app.extensions['services'].get('matching').match_cache.clear()
+    
+    return [
+        ('first dial', hop('')),
+        ('select type', hop('1')),
+        ('select subtype', hop('1')),
+        ('enter location', hop(location)),
+        ('confirm selection', hop('1')),
+    ], clear_match_cache
+
+def run_ussd(app, recorder):
+    """Measure every hop of a journey; returns {hop: statements}"""
+    results = {}
+    
+    # Warm process caches (search index detection, registry, templates) with a throwaway journey
+    hops, clear_match_cache = ussd_hops(app, '+2348100000000', 'budget_warmup')
+    for name, call in hops:
+        call()
+    
+    for phone_number, session_id, user_kind, cache_state in [
+        ('+2348100000001', 'budget_new', 'new user', 'miss'),
+        ('+2348100000001', 'budget_returning', 'returning user', 'hit'),
+    ]:
+        hops, clear_match_cache = ussd_hops(app, phone_number, session_id)
+        for name, call in hops:
+            if name == 'enter location' and cache_state == 'miss':
+                clear_match_cache()
+            
+            statements = recorder.measure(call)
+            if name == 'first dial':
+                name = f'first dial ({user_kind})'
+            elif name == 'enter location':
+                name = f'enter location (match cache {cache_state})'
+            results.setdefault(name, statements)
+    
+    return results
+
+def run_cumulative_ussd(app, recorder):
+    """Measure a new caller's journey in cumulative-text mode; returns {hop: statements}"""
+    results = {}
+    ussd = app.extensions['services'].get('ussd')
+    ussd.cumulative_text = True
+    try:
+        # A number of its own, so the earlier journeys haven't spent its rate limit
+        hops, clear_match_cache = ussd_hops(app, '+2348100000002', 'budget_cumulative', cumulative=True)
+        for name, call in hops:
+            statements = recorder.measure(call)
+            if name == 'first dial':
+                name = 'first dial (new user)'
+            elif name == 'enter location':
+                name = 'enter location (match cache hit)'
+            results[name] = statements
+        
+        # Callers nothing matches: the first fills the match cache, the second is waitlisted from it
+        for phone_number, session_id in [('+2348100000003', 'budget_no_match_first'), ('+2348100000004', 'budget_no_match')]:
+            hops, clear_match_cache = ussd_hops(app, phone_number, session_id, cumulative=True, location='Zungeru')
+            for name, call in hops[:-1]:
+                statements = recorder.measure(call)
+        results['enter location (no match, match cache hit)'] = statements
+    finally:
+        ussd.cumulative_text = False
+    
+    return results
+
+def run_api(app, recorder):
+    """Measure each API request after one warm-up call; returns {(method, path): statements}"""
+    client = app.test_client()
+    results = {}
+    
+    for method, path in API_BUDGETS:
+        def call():
+            if method == 'POST':
+                response = client.post(path, json={'resource_type': 'shelter', 'location': 'Lokoja'})
+            else:
+                response = client.get(path)
+            assert response.status_code == 200, f"{method} {path}: {response.status_code}"
+        
+        call()
+        results[(method, path)] = recorder.measure(call)
+    
+    return results
+
+def report(title, results, budgets, verbose):
+    """Print one table; return the names of checks over budget"""
+    print(f"\n{title}")
+    failures = []
+    
+    for name, budget in budgets.items():
+        statements = results[name]
+        label = ' '.join(name) if isinstance(name, tuple) else name
+        elapsed = sum(seconds for statement, parameters, seconds in statements) * 1000
+        over = len(statements) > budget
+        status = '❌' if over else '✅'
+        print(f"   {status} {label}: {len(statements)} queries (budget {budget}), {elapsed:.1f} ms in SQL")
+        
+        if over:
+            failures.append(label)
+        if over or verbose:
+            for statement, parameters, seconds in statements:
+                print(f"        {seconds * 1000:6.2f} ms  {' '.join(statement.split())[:140]}")
+    
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description='Check SQL statement budgets per USSD hop and API endpoint')
+    parser.add_argument('--verbose', action='store_true', help='list every statement, not only offenders')
+    args = parser.parse_args()
+    
+    print("🧮 SQL QUERY BUDGET CHECK")
+    print("=========================")
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'budget.db')}"
+        from app import create_app, db
+        
+        app = create_app('production')
+        # No external SMS calls, and no snapshot caching so /api/stats measures its real query path
+        app.config.update(SMS_GATEWAY_URL=None, SMS_API_KEY=None, DASHBOARD_SNAPSHOT_TTL=0)
+        seed(app)
+        
+        with app.app_context():
+            recorder = StatementRecorder(db.engine)
+        
+        failures = report('USSD hops (process_ussd_request)', run_ussd(app, recorder), USSD_BUDGETS, args.verbose)
+        failures += report('USSD hops (cumulative text)', run_cumulative_ussd(app, recorder),
+                           CUMULATIVE_BUDGETS, args.verbose)
+        failures += report('API endpoints', run_api(app, recorder), API_BUDGETS, args.verbose)
+        
+        # Write buffered activity while the database still exists
+        app.extensions['services'].get('users').stop(app)
+    
+    print()
+    if failures:
+        print(f"❌ {len(failures)} check(s) over budget: {', '.join(failures)}")
+        sys.exit(1)
+    
+    print("✅ All hops and endpoints within their query budgets")
+
+if __name__ == "__main__":
+    main()
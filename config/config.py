@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -10,6 +11,36 @@ class Config:
     USSD_GATEWAY_URL = os.environ.get('USSD_GATEWAY_URL')
     SMS_GATEWAY_URL = os.environ.get('SMS_GATEWAY_URL')
     SMS_API_KEY = os.environ.get('SMS_API_KEY')
+    SMS_SEGMENT_BUDGET = int(os.environ.get('SMS_SEGMENT_BUDGET', 1))
+    SMS_GATEWAY_BATCH_SIZE = int(os.environ.get('SMS_GATEWAY_BATCH_SIZE', 1))
+    SMS_GATEWAY_TIMEOUT = float(os.environ.get('SMS_GATEWAY_TIMEOUT', 10))
+    SMS_BREAKER_FAILURE_THRESHOLD = int(os.environ.get('SMS_BREAKER_FAILURE_THRESHOLD', 5))
+    SMS_BREAKER_RESET_SECONDS = float(os.environ.get('SMS_BREAKER_RESET_SECONDS', 5))
+    SMS_BREAKER_MAX_RESET_SECONDS = float(os.environ.get('SMS_BREAKER_MAX_RESET_SECONDS', 300))
+    SMS_DEFERRED_QUEUE_SIZE = int(os.environ.get('SMS_DEFERRED_QUEUE_SIZE', 10000))
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 100000))
+    LAST_ACTIVE_FLUSH_SECONDS = float(os.environ.get('LAST_ACTIVE_FLUSH_SECONDS', 30))
+    MATCH_CACHE_TTL = float(os.environ.get('MATCH_CACHE_TTL', 5))
+    MATCH_CACHE_SIZE = int(os.environ.get('MATCH_CACHE_SIZE', 10000))
+    DASHBOARD_SNAPSHOT_TTL = float(os.environ.get('DASHBOARD_SNAPSHOT_TTL', 5))
+    # Each open /admin/stream holds a worker thread for its lifetime
+    DASHBOARD_STREAM_MAX_CLIENTS = int(os.environ.get('DASHBOARD_STREAM_MAX_CLIENTS', 4))  # per worker process
+    DASHBOARD_STREAM_MAX_SECONDS = float(os.environ.get('DASHBOARD_STREAM_MAX_SECONDS', 120))
+    RESOURCE_SNAPSHOT_DIR = os.environ.get('RESOURCE_SNAPSHOT_DIR')  # defaults to /dev/shm
+    RESOURCE_SNAPSHOT_MAX_AGE = float(os.environ.get('RESOURCE_SNAPSHOT_MAX_AGE', 30))
+    JSON_CACHE_SIZE = int(os.environ.get('JSON_CACHE_SIZE', 50000))
+    USSD_MAX_IN_FLIGHT = int(os.environ.get('USSD_MAX_IN_FLIGHT', 16))  # per worker process
+    USSD_MAX_QUEUE = int(os.environ.get('USSD_MAX_QUEUE', 64))
+    USSD_QUEUE_TIMEOUT = float(os.environ.get('USSD_QUEUE_TIMEOUT', 2.0))
+    # Token buckets per endpoint: key kind -> (requests per minute, burst); JSON in the environment
+    USSD_RATE_LIMITS = json.loads(os.environ.get('USSD_RATE_LIMITS') or 'null') or {
+        'callback': {'phone': (20, 10), 'session': (30, 15)},
+        'test': {'phone': (60, 20), 'session': (60, 20)}
+    }
+    USSD_RESUME_MINUTES = float(os.environ.get('USSD_RESUME_MINUTES', 5))  # 0 disables resume on redial
+    # Gateway sends the whole path as text (1*2*Lokoja) rather than only the latest input
+    USSD_CUMULATIVE_TEXT = os.environ.get('USSD_CUMULATIVE_TEXT', 'false').lower() == 'true'
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 1000000))
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -186,6 +186,18 @@ def run_tests():
         print("⚠️ Test script not found, skipping tests")
         return True
 
+def run_performance_checks():
+    """Fail the deployment when cold start or per-hop query counts are over budget"""
+    print("⏱️ Running performance checks...")
+    for script in ["bench_startup.py", "check_query_budget.py"]:
+        result = subprocess.run([sys.executable, script], capture_output=True, text=True, timeout=300)
+        if result.returncode != 0:
+            print(f"❌ {script} failed:\n{result.stdout}{result.stderr}")
+            return False
+    
+    print("✅ Startup and query budgets met")
+    return True
+
 def print_deployment_checklist():
     """Print deployment checklist"""
     print("\n" + "="*60)
@@ -255,6 +267,11 @@ def main():
         print("❌ Deployment failed: Database setup failed")
         return False
     
+    # Startup time and query counts are capacity limits, so they block the deployment
+    if not run_performance_checks():
+        print("❌ Deployment failed: Performance budgets exceeded")
+        return False
+    
     # Run tests
     if not run_tests():
         print("⚠️ Warning: Some tests failed, but continuing deployment")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Local SMS Gateway Simulator
+
+A stand-in for the SMS provider so the real send path can be exercised
+offline. It accepts the same JSON payload SMSService posts and can inject
+latency, errors, rate limits and batch limits.
+
+Usage: python sms_gateway_simulator.py --port 8080 --latency-ms 150 --error-rate 0.05
+Then set SMS_GATEWAY_URL=http://localhost:8080/sms and any SMS_API_KEY.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class GatewaySimulator:
+    """Threaded HTTP server imitating an SMS gateway"""
+    
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=0, jitter_ms=0, error_rate=0.0,
+                 rate_limit=0, max_batch=100, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit  # accepted messages per second, 0 for unlimited
+        self.max_batch = max_batch
+        self.random = random.Random(seed)
+        self.stats = {'requests': 0, 'messages': 0, 'errors': 0, 'rate_limited': 0, 'rejected': 0}
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/sms"
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def serve_forever(self):
+        self._server.serve_forever()
+    
+    def reset_stats(self):
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] = 0
+    
+    def handle_send(self, payload):
+        """Return (status code, response body) for one gateway call"""
+        recipients = payload.get('to')
+        recipients = recipients if isinstance(recipients, list) else [recipients]
+        
+        with self._lock:
+            self.stats['requests'] += 1
+        
+        if not payload.get('api_key') or not payload.get('message') or not all(recipients):
+            with self._lock:
+                self.stats['rejected'] += 1
+            return 400, {'error': 'to, message and api_key are required'}
+        
+        if len(recipients) > self.max_batch:
+            with self._lock:
+                self.stats['rejected'] += 1
+            return 413, {'error': f'batch larger than {self.max_batch}'}
+        
+        delay = self.latency_ms + (self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        
+        with self._lock:
+            if self.rate_limit:
+                now = time.monotonic()
+                if now - self._window_start >= 1:
+                    self._window_start, self._window_count = now, 0
+                if self._window_count + len(recipients) > self.rate_limit:
+                    self.stats['rate_limited'] += 1
+                    return 429, {'error': 'rate limit exceeded'}
+                self._window_count += len(recipients)
+            
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.stats['errors'] += 1
+                return 500, {'error': 'simulated gateway failure'}
+            
+            self.stats['messages'] += len(recipients)
+        
+        return 200, {'accepted': len(recipients)}
+    
+    def _make_handler(self):
+        simulator = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    payload = json.loads(self.rfile.read(length) or b'{}')
+                except (ValueError, json.JSONDecodeError):
+                    return self._reply(400, {'error': 'invalid JSON'})
+                self._reply(*simulator.handle_send(payload))
+            
+            def do_GET(self):
+                if self.path == '/stats':
+                    with simulator._lock:
+                        return self._reply(200, dict(simulator.stats))
+                self._reply(404, {'error': 'not found'})
+            
+            def _reply(self, status, body):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local SMS gateway stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=int, default=0, help='messages per second, 0 for unlimited')
+    parser.add_argument('--max-batch', type=int, default=100)
+    args = parser.parse_args()
+    
+    simulator = GatewaySimulator(
+        host=args.host, port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, rate_limit=args.rate_limit, max_batch=args.max_batch
+    )
+    print(f"📡 SMS gateway simulator listening on {simulator.url}")
+    try:
+        simulator.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nStats: {simulator.stats}")
+
+if __name__ == "__main__":
+    main()